@@ -1,47 +1,208 @@
 import os
 import json
-from openai import OpenAI
+from collections import Counter
+from functools import partial
+from typing import Dict, List, Tuple
+from openai import OpenAI, AsyncOpenAI
 from loguru import logger
+from core.config import Config
+from core.cache import LLMCache, get_llm_cache
+from core.llm import JSON_MODE
+from core.routing import aroute_json, model_signature, route_json
+from core import singleflight
+from core.scheduler import PRIORITY_BULK
+from core.telemetry import telemetry
+from core.parsing import parse_json, parse_model_output, validate_data, schema_keys
+from core.retrieval import GroundTruthIndex
 from core.schemas import AuditReport, ComparisonReport # Ensure ComparisonReport is in your schemas
 
+
+def build_audit_messages(brand: str, niche: str) -> list:
+    """Prompt shared by the sync and async auditors."""
+    system_msg = (
+        "You are a Senior GEO Analyst. Return a strictly valid JSON object. "
+        "Analyze the brand's visibility in AI models. "
+        "CRITICAL: Use these exact keys: 'brand_name', 'visibility_score', "
+        "'recommendations', 'citations', 'hallucinations'."
+    )
+
+    user_msg = (
+        f"Conduct a deep-dive audit for '{brand}' in the '{niche}' sector. "
+        "1. Score visibility 0-100. 2. Provide 3 citation objects (source, sentiment, context). "
+        "3. Identify hallucinations (fact, correction). 4. List 3 strings for recommendations."
+    )
+
+    return [
+        {"role": "system", "content": system_msg},
+        {"role": "user", "content": user_msg}
+    ]
+
+
+def audit_fingerprint(brand: str, niche: str) -> str:
+    """Hash of every input that shapes an audit: prompt template, model and endpoint."""
+    return LLMCache.make_key(Config.GROQ_BASE_URL, model_signature(), build_audit_messages(brand, niche), JSON_MODE)
+
+
+def build_batch_audit_messages(brands: List[str], niche: str) -> list:
+    """One request auditing several brands of the same niche."""
+    system_msg = (
+        "You are a Senior GEO Analyst. Return a strictly valid JSON object. "
+        "Analyze each brand's visibility in AI models. "
+        "The top-level keys MUST be the brand names exactly as given. "
+        "Each value is an audit object using these exact keys: 'brand_name', 'visibility_score', "
+        "'recommendations', 'citations', 'hallucinations'."
+    )
+
+    user_msg = (
+        f"Conduct a deep-dive audit for each of these brands in the '{niche}' sector: "
+        f"{json.dumps(brands, ensure_ascii=False)}. For every brand: "
+        "1. Score visibility 0-100. 2. Provide 3 citation objects (source, sentiment, context). "
+        "3. Identify hallucinations (fact, correction). 4. List 3 strings for recommendations."
+    )
+
+    return [
+        {"role": "system", "content": system_msg},
+        {"role": "user", "content": user_msg}
+    ]
+
+
+def split_batch_response(raw: str, brands: List[str]) -> Tuple[Dict[str, AuditReport], List[str]]:
+    """Validates every entry of a batched answer on its own.
+
+    Returns the valid reports keyed by requested brand, plus the brands whose
+    entry was missing or invalid so they can be re-queued as single audits.
+    """
+    data = parse_json(raw, "perform_batch_audit")
+    if not isinstance(data, dict):
+        raise ValueError("Batch response is not a JSON object")
+    by_lower = {str(k).strip().lower(): v for k, v in data.items()}
+
+    reports, rejected = {}, []
+    for brand in brands:
+        entry = data.get(brand, by_lower.get(brand.lower()))
+        try:
+            reports[brand] = validate_data(entry, AuditReport)
+        except Exception:
+            rejected.append(brand)
+    return reports, rejected
+
+
+def _checked_json(raw: str) -> str:
+    """Rejects non-JSON output (so it is never cached) and returns it as clean JSON text."""
+    return json.dumps(parse_json(raw, "detect_hallucinations"), ensure_ascii=False)
+
+
+_parse_audit = partial(parse_model_output, schema=AuditReport)
+_AUDIT_KEYS = schema_keys(AuditReport)
+
+
+# Quality checks: a reason to escalate a cheap model's answer to the next model, or None
+def _audit_quality(report: AuditReport):
+    if not 0 <= report.visibility_score <= 100:
+        return f"visibility_score {report.visibility_score} out of range"
+    if not report.citations:
+        return "no citations"
+    if not report.recommendations:
+        return "no recommendations"
+    return None
+
+
+def _batch_quality(result):
+    return f"{len(result[1])} invalid entries" if result[1] else None
+
+
+def _keys_quality(*keys):
+    return lambda data: next((f"empty '{k}'" for k in keys if not data.get(k)), None)
+
+
+def _match_brand(name, candidates: List[str]):
+    """Maps a model-written brand name back onto one of ours (case/whitespace-insensitive)."""
+    if not isinstance(name, str):
+        return None
+    wanted = " ".join(name.split()).casefold()
+    return next((c for c in candidates if " ".join(c.split()).casefold() == wanted), None)
+
+
+def _track_usage(usage: Counter, response):
+    if response.usage is not None:
+        usage["calls"] += 1
+        usage["prompt_tokens"] += response.usage.prompt_tokens or 0
+        usage["completion_tokens"] += response.usage.completion_tokens or 0
+
+
 class GEOAuditor:
-    def __init__(self):
-        # Using Groq for high-speed audits
+    def __init__(self, cache: LLMCache = None, use_cache: bool = True, priority: int = PRIORITY_BULK):
+        # Using Groq for high-speed audits; retries go through the shared scheduler
         self.client = OpenAI(
-            base_url="https://api.groq.com/openai/v1", 
-            api_key=os.getenv("GROQ_API_KEY")
+            base_url=Config.GROQ_BASE_URL, 
+            api_key=os.getenv("GROQ_API_KEY"),
+            max_retries=0
         )
+        self.priority = priority
+        # Identical prompts are served from disk instead of the model
+        self.cache = (cache or get_llm_cache()) if use_cache else None
+        # Running prompt/completion token totals for this instance
+        self.usage = Counter()
+
+    def _complete(self, method: str, messages: list, parse=None, keys=None, check=None):
+        """Runs a JSON-mode completion through the cache and the model cascade.
+
+        `parse` validates the raw content; only responses that parse are cached.
+        `keys` are the expected top-level keys (or a {key: kind} map), used to cancel off-schema streams early.
+        `check` flags weak answers from cheaper models so they escalate.
+        """
+        key = LLMCache.make_key(Config.GROQ_BASE_URL, model_signature(), messages, JSON_MODE)
+        raw_content = self.cache.get(method, key) if self.cache else None
+        if raw_content is not None:
+            try:
+                with telemetry.span("validation", "GEOAuditor"):
+                    return parse(raw_content) if parse else raw_content
+            except ValueError:
+                pass  # unusable cached entry, ask the model again
+
+        #use standard json mode (streamed when GEO_STREAM=1)
+        response, result = route_json(self.client, messages, method, self.priority,
+                                      expected_keys=keys, parse=parse, check=check)
+        _track_usage(self.usage, response)
+        if self.cache:
+            self.cache.put(method, key, response.choices[0].message.content)
+        return result
+
+    @staticmethod
+    def _shared(name: str, key: str, fn, *args, **kwargs):
+        """Coalesces identical in-flight calls across pipelines (GEO_SINGLE_FLIGHT=0 disables)."""
+        if not Config.SINGLE_FLIGHT:
+            return fn(*args, **kwargs)
+        return singleflight.do(name, key, fn, *args, **kwargs)
 
     def perform_audit(self, brand: str, niche: str) -> AuditReport:
         """Executes a single-brand GEO visibility audit."""
         logger.info(f"🔍 Analyzing Brand: {brand}")
-        
-        system_msg = (
-            "You are a Senior GEO Analyst. Return a strictly valid JSON object. "
-            "Analyze the brand's visibility in AI models. "
-            "CRITICAL: Use these exact keys: 'brand_name', 'visibility_score', "
-            "'recommendations', 'citations', 'hallucinations'."
-        )
-        
-        user_msg = (
-            f"Conduct a deep-dive audit for '{brand}' in the '{niche}' sector. "
-            "1. Score visibility 0-100. 2. Provide 3 citation objects (source, sentiment, context). "
-            "3. Identify hallucinations (fact, correction). 4. List 3 strings for recommendations."
-        )
 
-        # Using modern 'parse' to force Pydantic compliance
-        response = self.client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=[
-                {"role": "system", "content": system_msg},
-                {"role": "user", "content": user_msg}
-            ],
-            #use standard json mode 
-            response_format={"type": "json_object"}
+        # A battle and a bulk run auditing the same brand at once share one call
+        return self._shared(
+            "perform_audit", audit_fingerprint(brand, niche), self._complete,
+            "perform_audit", build_audit_messages(brand, niche), parse=_parse_audit, keys=_AUDIT_KEYS,
+            check=_audit_quality
         )
-        # FIX: Manually validate the response content
-        raw_content = response.choices[0].message.content
-        return AuditReport.model_validate_json(raw_content)
+
+    def perform_batch_audit(self, brands: List[str], niche: str) -> Tuple[Dict[str, AuditReport], List[str]]:
+        """Audits several same-niche brands in one JSON-mode request.
+
+        Returns (reports, rejected); rejected brands should be re-run with perform_audit.
+        """
+        logger.info(f"📦 Batch-analyzing {len(brands)} brands in {niche}")
+        try:
+            return self._complete(
+                "perform_batch_audit",
+                build_batch_audit_messages(brands, niche),
+                parse=partial(split_batch_response, brands=brands),
+                keys=dict.fromkeys(brands, "object"),
+                check=_batch_quality
+            )
+        except Exception as e:
+            logger.warning(f"Batch of {len(brands)} failed ({str(e)[:50]}), re-queuing individually")
+            return {}, list(brands)
     
     def compare_brands(self, report_a: AuditReport, report_b: AuditReport, niche: str) -> ComparisonReport:
         """Pits two reports against each other by asking AI for only the summary."""
@@ -50,22 +211,23 @@ class GEOAuditor:
         system_msg = (
             "You are a Competitive Intelligence Agent. Compare the two provided brand audits. "
             "Identify the winner and explain why in 3-4 sentences. "
-            "Return ONLY a JSON object with the key 'winner_summary'."
+            "Return ONLY a JSON object with the keys 'winner' (the winning brand_name, verbatim) "
+            "and 'winner_summary'."
         )
         
         user_msg = f"Audit A: {report_a.model_dump_json()}\nAudit B: {report_b.model_dump_json()}\nNiche: {niche}"
 
-        response = self.client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=[
+        # 1. Parse the AI response
+        ai_data = self._complete(
+            "compare_brands",
+            [
                 {"role": "system", "content": system_msg},
                 {"role": "user", "content": user_msg}
             ],
-            response_format={"type": "json_object"}
+            parse=partial(parse_json, name="compare_brands"),
+            keys=("winner", "winner_summary"),
+            check=_keys_quality("winner", "winner_summary")
         )
-        
-        # 1. Parse the AI response
-        ai_data = json.loads(response.choices[0].message.content)
         raw_summary = ai_data.get("winner_summary", "Comparison complete.")
 
         # 2. SAFETY CHECK: If Llama sent a dict instead of a string, flatten it
@@ -80,11 +242,66 @@ class GEOAuditor:
             brand_a=report_a,
             brand_b=report_b,
             market_niche=niche,
-            winner_summary=summary_text # Now guaranteed to be a string!
+            winner_summary=summary_text, # Now guaranteed to be a string!
+            winner=_match_brand(ai_data.get("winner"), [report_a.brand_name, report_b.brand_name])
+        )
+
+    def rank_brands(self, reports: List[AuditReport], niche: str) -> Tuple[List[Tuple[str, str]], str]:
+        """Ranks a whole league of audits in one call instead of N*(N-1)/2 comparisons.
+
+        Returns ([(brand_name, rationale), ...] best first, summary). Brands the
+        model leaves out are appended by visibility score.
+        """
+        logger.info(f"🏆 Ranking {len(reports)} brands in {niche}")
+
+        system_msg = (
+            "You are a Competitive Intelligence Agent ranking a league of brands. "
+            "Order every provided brand audit from strongest to weakest AI visibility. "
+            "Return ONLY a JSON object with the keys 'ranking' (a list of objects with "
+            "'brand_name' verbatim and a one-sentence 'rationale') and 'summary' (3-4 sentences)."
+        )
+        user_msg = "\n".join(f"Audit {i + 1}: {r.model_dump_json()}" for i, r in enumerate(reports))
+        user_msg += f"\nNiche: {niche}"
+
+        ai_data = self._complete(
+            "rank_brands",
+            [
+                {"role": "system", "content": system_msg},
+                {"role": "user", "content": user_msg}
+            ],
+            parse=partial(parse_json, name="rank_brands"),
+            keys=("ranking", "summary"),
+            check=_keys_quality("ranking", "summary")
         )
-    def detect_hallucinations(self, ai_response: str, ground_truth_docs: str):
-        """Compares AI claims against the client's verified data."""
+
+        names = [r.brand_name for r in reports]
+        ranking, seen = [], set()
+        for entry in ai_data.get("ranking") or []:
+            if isinstance(entry, str):
+                entry = {"brand_name": entry}
+            if not isinstance(entry, dict):
+                continue
+            name = _match_brand(entry.get("brand_name"), names)
+            if name and name not in seen:
+                seen.add(name)
+                ranking.append((name, str(entry.get("rationale") or "")))
+        for report in sorted(reports, key=lambda r: -r.visibility_score):
+            if report.brand_name not in seen:
+                ranking.append((report.brand_name, ""))
+        return ranking, str(ai_data.get("summary") or "Ranking complete.")
+
+    def detect_hallucinations(self, ai_response: str, ground_truth_docs: str, brand: str = None):
+        """Compares AI claims against the client's verified data.
+
+        Large corpora are not pasted whole: the brand's BM25 index picks the
+        passages relevant to each claim in the AI response.
+        """
         logger.info("🛡️ Running Hallucination Verification...")
+
+        if len(ground_truth_docs) > Config.RETRIEVAL_MIN_CHARS:
+            index = GroundTruthIndex(brand)
+            index.sync(ground_truth_docs)
+            ground_truth_docs = "\n---\n".join(index.passages_for_claims(ai_response))
         
         verification_prompt = f"""
         Compare this AI statement against the official ground truth.
@@ -96,12 +313,76 @@ class GEOAuditor:
         Return a JSON list of objects with 'fact', 'severity', and 'correction'.
         """
         
-        response = self.client.chat.completions.create(
-            model="llama-3.3-70b-versatile", # Switched to Groq for speed
-            messages=[{"role": "user", "content": verification_prompt}],
-            response_format={"type": "json_object"}
+        # Switched to Groq for speed
+        return self._complete(
+            "detect_hallucinations",
+            [{"role": "user", "content": verification_prompt}],
+            parse=_checked_json
         )
-        return response.choices[0].message.content
 
-  
-        return response.choices[0].message.parsed
\ No newline at end of file
+
+class AsyncGEOAuditor:
+    """Asyncio twin of GEOAuditor used by the concurrent bulk engine."""
+
+    def __init__(self, cache: LLMCache = None, use_cache: bool = True, priority: int = PRIORITY_BULK):
+        # One pooled client shared by every in-flight audit
+        self.client = AsyncOpenAI(
+            base_url=Config.GROQ_BASE_URL,
+            api_key=os.getenv("GROQ_API_KEY"),
+            max_retries=0
+        )
+        self.priority = priority
+        self.cache = (cache or get_llm_cache()) if use_cache else None
+        self.usage = Counter()
+
+    async def _complete(self, method: str, messages: list, parse=None, keys=None, check=None):
+        """Async counterpart of GEOAuditor._complete (same cache keys)."""
+        key = LLMCache.make_key(Config.GROQ_BASE_URL, model_signature(), messages, JSON_MODE)
+        raw_content = self.cache.get(method, key) if self.cache else None
+        if raw_content is not None:
+            try:
+                with telemetry.span("validation", "GEOAuditor"):
+                    return parse(raw_content) if parse else raw_content
+            except ValueError:
+                pass
+
+        response, result = await aroute_json(self.client, messages, method, self.priority,
+                                             expected_keys=keys, parse=parse, check=check)
+        _track_usage(self.usage, response)
+        if self.cache:
+            self.cache.put(method, key, response.choices[0].message.content)
+        return result
+
+    @staticmethod
+    async def _shared(name: str, key: str, fn, *args, **kwargs):
+        if not Config.SINGLE_FLIGHT:
+            return await fn(*args, **kwargs)
+        return await singleflight.ado(name, key, fn, *args, **kwargs)
+
+    async def perform_audit(self, brand: str, niche: str) -> AuditReport:
+        """Executes a single-brand GEO visibility audit without blocking the event loop."""
+        logger.info(f"🔍 Analyzing Brand: {brand}")
+
+        return await self._shared(
+            "perform_audit", audit_fingerprint(brand, niche), self._complete,
+            "perform_audit", build_audit_messages(brand, niche), parse=_parse_audit, keys=_AUDIT_KEYS,
+            check=_audit_quality
+        )
+
+    async def perform_batch_audit(self, brands: List[str], niche: str) -> Tuple[Dict[str, AuditReport], List[str]]:
+        """Async counterpart of GEOAuditor.perform_batch_audit."""
+        logger.info(f"📦 Batch-analyzing {len(brands)} brands in {niche}")
+        try:
+            return await self._complete(
+                "perform_batch_audit",
+                build_batch_audit_messages(brands, niche),
+                parse=partial(split_batch_response, brands=brands),
+                keys=dict.fromkeys(brands, "object"),
+                check=_batch_quality
+            )
+        except Exception as e:
+            logger.warning(f"Batch of {len(brands)} failed ({str(e)[:50]}), re-queuing individually")
+            return {}, list(brands)
+
+    async def close(self):
+        await self.client.close()
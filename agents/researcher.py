@@ -1,23 +1,43 @@
 import os
 from typing import List
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from openai import OpenAI
 from loguru import logger
 from tools.search import PerplexitySearch
-from core.schemas import CompetitorAnalysis
+from core.config import Config
+from core.routing import route_json
+from core.scheduler import PRIORITY_INTERACTIVE
+from core.parsing import parse_model_output, schema_keys
+from core.schemas import CompetitorAnalysis, CompetitorMetrics, TopicFinding
 
 class CompetitorAgent:
-    def __init__(self):
+    def __init__(self, priority: int = PRIORITY_INTERACTIVE):
         # Tools for live web research
-        self.search_tool = PerplexitySearch()
+        self.priority = priority
+        self.search_tool = PerplexitySearch(priority=priority)
         
-        # Pointing the client to Groq's servers
+        # Pointing the client to Groq's servers (retries handled by the shared scheduler)
         self.ai_client = OpenAI(
-            base_url="https://api.groq.com/openai/v1", 
-            api_key=os.getenv("GROQ_API_KEY")
+            base_url=Config.GROQ_BASE_URL, 
+            api_key=os.getenv("GROQ_API_KEY"),
+            max_retries=0
         )
 
-    def compare_brands(self, client_brand: str, competitors: List[str], niche: str) -> CompetitorAnalysis:
+    def _structure(self, messages: list, schema, check=None):
+        """One Groq structuring call validated into `schema` (repaired locally when possible)."""
+        _, result = route_json(self.ai_client, messages, schema.__name__, self.priority, component="CompetitorAgent",
+                               expected_keys=schema_keys(schema), parse=partial(parse_model_output, schema=schema),
+                               check=check)
+        return result
+
+    def compare_brands(self, client_brand: str, competitors: List[str], niche: str,
+                       topics: List[str] = None, mode: str = None) -> CompetitorAnalysis:
         """Researches competitors and extracts a structured gap analysis via Groq."""
+        mode = mode or Config.RESEARCH_MODE
+        if mode == "pipelined":
+            return self.compare_brands_pipelined(client_brand, competitors, niche, topics)
+
         logger.info(f"🛰️ Researching Market for {client_brand}...")
 
         # 1. Fetch live market data using Perplexity
@@ -26,6 +46,7 @@ class CompetitorAgent:
             f"Compare {client_brand} against {', '.join(competitors)}. "
             "Highlight specific topics, keywords, and features where competitors are mentioned more than the client."
         )
+        # Raises SearchError: a gap analysis with no research behind it is worse than none
         raw_market_data = self.search_tool.search(query)
 
         # 2. Instruct Groq/Llama to structure the findings
@@ -41,15 +62,95 @@ class CompetitorAgent:
             "Return a JSON object matching the CompetitorAnalysis schema."
         )
 
-        response = self.ai_client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=[
-                {"role": "system", "content": system_instruction},
-                {"role": "user", "content": user_prompt}
-            ],
-            response_format={"type": "json_object"}
-        )
+        messages = [
+            {"role": "system", "content": system_instruction},
+            {"role": "user", "content": user_prompt}
+        ]
 
         # 3. Validate the JSON string into our Pydantic model
-        raw_json = response.choices[0].message.content
-        return CompetitorAnalysis.model_validate_json(raw_json)
\ No newline at end of file
+        return self._structure(messages, CompetitorAnalysis,
+                               check=lambda analysis: None if analysis.leaderboard else "empty leaderboard")
+
+    # --- pipelined fan-out ---
+    def _research_brand(self, brand: str, niche: str) -> CompetitorMetrics:
+        raw = self.search_tool.search(
+            f"How visible is {brand} in AI and web answers about the {niche} industry? "
+            "List the sources that cite it and the overall tone of those mentions."
+        )
+        return self._structure([
+            {"role": "system", "content": (
+                "You are a Brand Visibility Analyst. Summarize the research as a JSON object with the keys "
+                "'brand_name', 'citation_count' (int), 'top_sources' (list of strings) and "
+                "'sentiment_score' (0.0 to 1.0)."
+            )},
+            {"role": "user", "content": f"Brand: {brand}\nResearch: {raw}"}
+        ], CompetitorMetrics)
+
+    def _research_topic(self, topic: str, client_brand: str, brands: List[str], niche: str) -> TopicFinding:
+        raw = self.search_tool.search(
+            f"In the {niche} industry, which of these brands do AI answers recommend for {topic}: "
+            f"{', '.join(brands)}? Cite sources."
+        )
+        return self._structure([
+            {"role": "system", "content": (
+                "You are a Topic Analyst. Summarize the research as a JSON object with the keys "
+                "'topic', 'leaders' (brand names recommended for the topic, strongest first) and "
+                "'client_mentioned' (bool)."
+            )},
+            {"role": "user", "content": f"Topic: {topic}\nClient: {client_brand}\nResearch: {raw}"}
+        ], TopicFinding)
+
+    def compare_brands_pipelined(self, client_brand: str, competitors: List[str], niche: str,
+                                 topics: List[str] = None) -> CompetitorAnalysis:
+        """Fan-out research: one query per brand and per topic, all in flight at once.
+
+        Each result is structured as soon as its search returns, so total
+        latency tracks the slowest single query instead of one giant prompt.
+        Failed queries are dropped and the rest merged into one analysis;
+        brands whose research failed are listed in `unresearched`.
+        """
+        topics = topics or Config.RESEARCH_TOPICS
+        brands = [client_brand] + [c for c in competitors if c != client_brand]
+        logger.info(f"🛰️ Fan-out research for {client_brand}: {len(brands)} brands x {len(topics)} topics")
+
+        metrics, findings, failed, unresearched = {}, [], 0, []
+        workers = min(self.search_tool.max_workers, len(brands) + len(topics))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="research") as pool:
+            jobs = {pool.submit(self._research_brand, brand, niche): ("brand", brand) for brand in brands}
+            jobs.update({
+                pool.submit(self._research_topic, topic, client_brand, brands, niche): ("topic", topic)
+                for topic in topics
+            })
+            for job in as_completed(jobs):
+                kind, label = jobs[job]
+                try:
+                    result = job.result()
+                except Exception as e:
+                    failed += 1
+                    if kind == "brand":
+                        unresearched.append(label)
+                    logger.warning(f"Research on {kind} '{label}' failed ({str(e)[:50]}), merging without it")
+                    continue
+                if kind == "brand":
+                    # Keep our spelling of the brand, whatever the model wrote
+                    metrics[label] = result.model_copy(update={"brand_name": label})
+                else:
+                    findings.append(result.model_copy(update={"topic": label}))
+
+        if not metrics and not findings:
+            raise ValueError(f"All {failed} research queries for {client_brand} failed")
+
+        # Merge: leaderboard by citations, gaps where rivals lead and the client is absent
+        leaderboard = sorted(metrics.values(), key=lambda m: (-m.citation_count, -m.sentiment_score))
+        gaps = []
+        for finding in sorted(findings, key=lambda f: topics.index(f.topic)):
+            rivals = [b for b in finding.leaders if b != client_brand]
+            if rivals and not finding.client_mentioned:
+                gaps.append(f"{finding.topic} (led by {', '.join(rivals[:3])})")
+
+        return CompetitorAnalysis(
+            market_query=f"{niche}: {client_brand} vs {', '.join(brands[1:])} across {', '.join(topics)}",
+            leaderboard=leaderboard,
+            citation_gaps=gaps,
+            unresearched=[b for b in brands if b in unresearched],
+        )
@@ -0,0 +1,97 @@
+"""Batched vs one-brand-per-call audit benchmark.
+
+Runs the same brand list through GEOAuditor.perform_audit and through
+GEOAuditor.perform_batch_audit (cache disabled) and prints tokens per brand
+and wall time per brand for each mode.
+
+    python -m bench.batch_audit --niche Aerospace --brands "SpaceX,Blue Origin,Rocket Lab" --batch-size 3
+    python -m bench.batch_audit --niche Fintech --brands "A,B,C,D,E,F" --mock --rate-malformed 0.1
+
+With --mock the calls go to bench.mock_server instead of Groq, seeded so
+repeated runs answer identically.
+"""
+import json
+import time
+import argparse
+import contextlib
+from bench.mock_server import MockProviderServer, add_mock_arguments, settings_from_args
+
+
+def _run_single(brands, niche):
+    from agents.auditor import GEOAuditor
+
+    auditor = GEOAuditor(use_cache=False)
+    ok = 0
+    started = time.perf_counter()
+    for brand in brands:
+        try:
+            auditor.perform_audit(brand, niche)
+            ok += 1
+        except Exception:
+            pass
+    return auditor.usage, ok, time.perf_counter() - started
+
+
+def _run_batched(brands, niche, batch_size):
+    from agents.auditor import GEOAuditor
+
+    auditor = GEOAuditor(use_cache=False)
+    ok, requeued = 0, 0
+    started = time.perf_counter()
+    for i in range(0, len(brands), batch_size):
+        reports, rejected = auditor.perform_batch_audit(brands[i:i + batch_size], niche)
+        ok += len(reports)
+        for brand in rejected:
+            requeued += 1
+            try:
+                auditor.perform_audit(brand, niche)
+                ok += 1
+            except Exception:
+                pass
+    return auditor.usage, ok, time.perf_counter() - started, requeued
+
+
+def _summary(usage, ok, elapsed, n):
+    tokens = usage["prompt_tokens"] + usage["completion_tokens"]
+    return {
+        "brands": n,
+        "succeeded": ok,
+        "calls": usage["calls"],
+        "prompt_tokens_per_brand": round(usage["prompt_tokens"] / n, 1),
+        "completion_tokens_per_brand": round(usage["completion_tokens"] / n, 1),
+        "tokens_per_brand": round(tokens / n, 1),
+        "wall_s_per_brand": round(elapsed / n, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--niche", required=True)
+    parser.add_argument("--brands", required=True, help="Comma-separated brand names")
+    parser.add_argument("--batch-size", type=int, default=5)
+    parser.add_argument("--mock", action="store_true", help="Run against bench.mock_server instead of Groq")
+    add_mock_arguments(parser)
+    parser.set_defaults(seed=0)
+    args = parser.parse_args()
+
+    brands = [b.strip() for b in args.brands.split(",") if b.strip()]
+    with contextlib.ExitStack() as stack:
+        if args.mock:
+            from bench.run import point_at_mock
+
+            # Must happen before agents.auditor pulls in core.config
+            point_at_mock(stack.enter_context(MockProviderServer(settings_from_args(args))))
+
+        usage, ok, elapsed = _run_single(brands, args.niche)
+        single = _summary(usage, ok, elapsed, len(brands))
+
+        usage, ok, elapsed, requeued = _run_batched(brands, args.niche, args.batch_size)
+        batched = _summary(usage, ok, elapsed, len(brands))
+        batched["batch_size"] = args.batch_size
+        batched["requeued"] = requeued
+
+    print(json.dumps({"single": single, "batched": batched}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
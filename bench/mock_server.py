@@ -0,0 +1,397 @@
+"""Local stand-in for the Groq (OpenAI-compatible) and Perplexity endpoints.
+
+Routes:
+    POST /openai/v1/chat/completions      -> GEOAuditor / CompetitorAgent
+    POST /perplexity/chat/completions     -> PerplexitySearch
+
+Latency is drawn from a log-normal distribution per endpoint, and a
+configurable fraction of calls is answered with 429 (with Retry-After) or
+with malformed JSON (fenced or truncated) to exercise retries and repair.
+Requests with "stream": true get server-sent events; a fraction of those
+can be made to hang mid-generation to exercise stream deadlines. Small
+models (8b / instant / mini) answer faster and can be made to return weak
+audits, and a fraction of calls can be made very slow, to exercise the
+model cascade and hedged requests.
+
+    python -m bench.mock_server --port 8765 --llm-median-ms 400 --rate-429 0.05
+"""
+import re
+import ast
+import json
+import math
+import time
+import random
+import argparse
+import threading
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+LLM_PATH = "/openai/v1/chat/completions"
+SEARCH_PATH = "/perplexity/chat/completions"
+
+
+@dataclass
+class LatencyProfile:
+    """Log-normal latency: `median_ms` scaled by exp(sigma * N(0, 1))."""
+    median_ms: float = 300.0
+    sigma: float = 0.4
+
+    def sample(self) -> float:
+        if self.median_ms <= 0:
+            return 0.0
+        return self.median_ms / 1000.0 * math.exp(self.sigma * random.gauss(0, 1))
+
+
+@dataclass
+class MockSettings:
+    llm: LatencyProfile = field(default_factory=LatencyProfile)
+    search: LatencyProfile = field(default_factory=lambda: LatencyProfile(800.0, 0.5))
+    rate_429: float = 0.0
+    rate_malformed: float = 0.0
+    retry_after: float = 0.2
+    rate_stall: float = 0.0
+    stall_seconds: float = 30.0
+    small_model_speedup: float = 3.0  # small models answer this many times faster
+    rate_weak: float = 0.0  # fraction of small-model audits returned without citations
+    rate_slow: float = 0.0  # fraction of LLM calls that take slow_factor times longer
+    slow_factor: float = 10.0
+    seed: int = None
+
+
+class MockStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = {}
+        self.latencies = {"llm": [], "search": []}
+
+    def bump(self, key: str):
+        with self._lock:
+            self.counts[key] = self.counts.get(key, 0) + 1
+
+    def observe(self, stage: str, seconds: float):
+        with self._lock:
+            self.latencies[stage].append(seconds)
+
+    def reset(self):
+        with self._lock:
+            self.counts = {}
+            self.latencies = {"llm": [], "search": []}
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"counts": dict(self.counts), "latencies": {k: list(v) for k, v in self.latencies.items()}}
+
+
+# --- canned model answers ---------------------------------------------------
+
+def _audit(brand: str) -> dict:
+    rng = random.Random(brand)
+    return {
+        "brand_name": brand,
+        "visibility_score": rng.randint(10, 95),
+        "citations": [
+            {"source": src, "sentiment": rng.choice(["positive", "neutral", "negative"]),
+             "context": f"{brand} mentioned on {src}"}
+            for src in rng.sample(["Wikipedia", "Reddit", "TechCrunch", "Forbes", "G2", "YouTube"], 3)
+        ],
+        "hallucinations": [
+            {"fact": f"{brand} was founded in 1850", "correction": "Founding date is incorrect"}
+        ] if rng.random() < 0.3 else [],
+        "recommendations": [
+            f"Publish structured data for {brand}",
+            "Earn citations on high-authority review sites",
+            "Keep pricing pages crawlable and current",
+        ],
+    }
+
+
+def _answer_for(messages: list) -> dict:
+    system = next((m["content"] for m in messages if m.get("role") == "system"), "")
+    user = next((m["content"] for m in reversed(messages) if m.get("role") == "user"), "")
+
+    if "keys MUST be the brand names" in system:
+        match = re.search(r"sector: (\[.*?\])\.", user)
+        brands = json.loads(match.group(1)) if match else []
+        return {brand: _audit(brand) for brand in brands}
+    if "Senior GEO Analyst" in system:
+        match = re.search(r"audit for '(.+?)' in the", user)
+        return _audit(match.group(1) if match else "Unknown")
+    if "ranking a league" in system:
+        names = re.findall(r'"brand_name":\s*"(.+?)"', user)
+        random.shuffle(names)
+        return {
+            "ranking": [{"brand_name": n, "rationale": "Cited more often by authority sources."} for n in names],
+            "summary": "The leaders dominate citations; the tail is rarely mentioned by AI models.",
+        }
+    if "Competitive Intelligence" in system:
+        names = re.findall(r'"brand_name":\s*"(.+?)"', user)
+        return {"winner": random.choice(names) if names else None,
+                "winner_summary": "Brand A leads on citations and sentiment; Brand B trails on authority sources."}
+    if "Brand Visibility Analyst" in system:
+        brand = re.search(r"Brand: (.+)", user)
+        name = brand.group(1) if brand else "Unknown"
+        rng = random.Random(name)
+        return {"brand_name": name, "citation_count": rng.randint(1, 50),
+                "top_sources": rng.sample(["Wikipedia", "Reddit", "G2", "Forbes", "YouTube"], 2),
+                "sentiment_score": round(rng.random(), 2)}
+    if "Topic Analyst" in system:
+        topic = re.search(r"Topic: (.+)", user)
+        return {"topic": topic.group(1) if topic else "unknown", "leaders": ["Competitor 0", "Competitor 1"],
+                "client_mentioned": random.random() < 0.5}
+    if "Market Intelligence" in system:
+        client = re.search(r"gap analysis for (.+?) vs ", user)
+        rivals = re.search(r" vs (\[.*?\])\.", user)
+        names = [client.group(1) if client else "Client"]
+        if rivals:
+            try:
+                names += list(ast.literal_eval(rivals.group(1)))
+            except (ValueError, SyntaxError):
+                pass
+        return {
+            "market_query": "mock market research",
+            "leaderboard": [
+                {"brand_name": n, "citation_count": random.randint(1, 50),
+                 "top_sources": ["Wikipedia", "Reddit"], "sentiment_score": round(random.random(), 2)}
+                for n in names
+            ],
+            "citation_gaps": ["pricing comparisons", "integration guides"],
+        }
+    if "official ground truth" in user:
+        return {"hallucinations": [{"fact": "Claimed free tier", "severity": "high", "correction": "No free tier"}]}
+    return {}
+
+
+_SMALL_MODEL = re.compile(r"8b|instant|mini", re.IGNORECASE)
+
+
+def _weaken(answer: dict) -> dict:
+    """What a small model gets wrong: valid JSON, but an audit with no evidence."""
+    if "citations" in answer:
+        return dict(answer, citations=[])
+    return answer
+
+
+def _malform(content: str) -> str:
+    if random.random() < 0.5:
+        return f"Here is the JSON you asked for:\n```json\n{content}\n```"
+    return content[: max(1, int(len(content) * 0.8))]
+
+
+def _completion(model: str, content: str, prompt_chars: int) -> dict:
+    completion_tokens = max(1, len(content) // 4)
+    prompt_tokens = max(1, prompt_chars // 4)
+    return {
+        "id": f"chatcmpl-mock-{random.getrandbits(32):08x}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                  "total_tokens": prompt_tokens + completion_tokens},
+    }
+
+
+def _stream_chunks(model: str, content: str, prompt_chars: int, pieces: int = 8):
+    completion = _completion(model, content, prompt_chars)
+    base = {k: completion[k] for k in ("id", "created", "model")}
+    step = max(1, math.ceil(len(content) / pieces))
+    for i in range(0, len(content), step):
+        yield dict(base, object="chat.completion.chunk", usage=None,
+                   choices=[{"index": 0, "delta": {"content": content[i:i + step]}, "finish_reason": None}])
+    yield dict(base, object="chat.completion.chunk", usage=None,
+               choices=[{"index": 0, "delta": {}, "finish_reason": "stop"}])
+    yield dict(base, object="chat.completion.chunk", choices=[], usage=completion["usage"])
+
+
+def make_handler(settings: MockSettings, stats: MockStats):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status: int, body: dict, headers: dict = None):
+            payload = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def _send_stream(self, chunks: list, latency: float, stall: bool):
+            """SSE: ~30% of the latency before the first token, the rest spread over the chunks."""
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            self.close_connection = True
+            gap = latency * 0.7 / max(1, len(chunks))
+            try:
+                for i, chunk in enumerate(chunks):
+                    if stall and i == len(chunks) // 2:
+                        time.sleep(settings.stall_seconds)
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                    self.wfile.flush()
+                    time.sleep(gap)
+                self.wfile.write(b"data: [DONE]\n\n")
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # client cancelled the stream
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+
+            if self.path == LLM_PATH:
+                stage = "llm"
+            elif self.path == SEARCH_PATH:
+                stage = "search"
+            else:
+                self._send(404, {"error": {"message": f"unknown path {self.path}"}})
+                return
+
+            started = time.perf_counter()
+            latency = (settings.llm if stage == "llm" else settings.search).sample()
+            model = request.get("model", "mock")
+            small = stage == "llm" and bool(_SMALL_MODEL.search(model))
+            if small:
+                latency /= settings.small_model_speedup
+            if stage == "llm" and random.random() < settings.rate_slow:
+                stats.bump("llm_slow")
+                latency *= settings.slow_factor
+            streaming = stage == "llm" and request.get("stream")
+            time.sleep(latency * 0.3 if streaming else latency)
+
+            if random.random() < settings.rate_429:
+                stats.bump(f"{stage}_429")
+                self._send(429, {"error": {"message": "Rate limit reached", "type": "rate_limit"}},
+                           {"Retry-After": str(settings.retry_after)})
+                return
+
+            messages = request.get("messages", [])
+            prompt_chars = sum(len(str(m.get("content", ""))) for m in messages)
+            if stage == "llm":
+                answer = _answer_for(messages)
+                if small and random.random() < settings.rate_weak:
+                    stats.bump("llm_weak")
+                    answer = _weaken(answer)
+                content = json.dumps(answer)
+                if random.random() < settings.rate_malformed:
+                    stats.bump("llm_malformed")
+                    content = _malform(content)
+            else:
+                topic = messages[-1]["content"][:80] if messages else ""
+                content = f"Mock research results for: {topic}. Sources: [1] wikipedia.org [2] reddit.com"
+
+            stats.bump(stage)
+            if stage == "llm":
+                stats.bump(f"llm:{model}")
+            if streaming:
+                stall = random.random() < settings.rate_stall
+                if stall:
+                    stats.bump("llm_stalled")
+                chunks = list(_stream_chunks(model, content, prompt_chars))
+                self._send_stream(chunks, latency, stall)
+                stats.observe(stage, time.perf_counter() - started)
+                return
+            stats.observe(stage, time.perf_counter() - started)
+            self._send(200, _completion(model, content, prompt_chars))
+
+    return Handler
+
+
+class MockProviderServer:
+    """Runs the mock endpoints on a background thread."""
+
+    def __init__(self, settings: MockSettings = None, host: str = "127.0.0.1", port: int = 0):
+        self.settings = settings or MockSettings()
+        if self.settings.seed is not None:
+            random.seed(self.settings.seed)
+        self.stats = MockStats()
+        self.httpd = ThreadingHTTPServer((host, port), make_handler(self.settings, self.stats))
+        self.httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="mock-provider", daemon=True)
+
+    @property
+    def base(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def groq_base_url(self) -> str:
+        return self.base + LLM_PATH.rsplit("/chat/completions", 1)[0]
+
+    @property
+    def perplexity_url(self) -> str:
+        return self.base + SEARCH_PATH
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def settings_from_args(args) -> MockSettings:
+    return MockSettings(
+        llm=LatencyProfile(args.llm_median_ms, args.llm_sigma),
+        search=LatencyProfile(args.search_median_ms, args.search_sigma),
+        rate_429=args.rate_429,
+        rate_malformed=args.rate_malformed,
+        retry_after=args.retry_after,
+        rate_stall=args.rate_stall,
+        stall_seconds=args.stall_seconds,
+        small_model_speedup=args.small_model_speedup,
+        rate_weak=args.rate_weak,
+        rate_slow=args.rate_slow,
+        slow_factor=args.slow_factor,
+        seed=args.seed,
+    )
+
+
+def add_mock_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--llm-median-ms", type=float, default=300.0)
+    parser.add_argument("--llm-sigma", type=float, default=0.4)
+    parser.add_argument("--search-median-ms", type=float, default=800.0)
+    parser.add_argument("--search-sigma", type=float, default=0.5)
+    parser.add_argument("--rate-429", type=float, default=0.0, help="Fraction of calls answered with 429")
+    parser.add_argument("--rate-malformed", type=float, default=0.0, help="Fraction of LLM answers with broken JSON")
+    parser.add_argument("--retry-after", type=float, default=0.2, help="Retry-After seconds sent with 429s")
+    parser.add_argument("--rate-stall", type=float, default=0.0, help="Fraction of streamed answers that hang midway")
+    parser.add_argument("--stall-seconds", type=float, default=30.0)
+    parser.add_argument("--small-model-speedup", type=float, default=3.0)
+    parser.add_argument("--rate-weak", type=float, default=0.0, help="Fraction of small-model audits without citations")
+    parser.add_argument("--rate-slow", type=float, default=0.0, help="Fraction of LLM calls slowed by --slow-factor")
+    parser.add_argument("--slow-factor", type=float, default=10.0)
+    parser.add_argument("--seed", type=int)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    add_mock_arguments(parser)
+    args = parser.parse_args()
+
+    server = MockProviderServer(settings_from_args(args), args.host, args.port)
+    print(f"GROQ_BASE_URL={server.groq_base_url}")
+    print(f"PERPLEXITY_BASE_URL={server.perplexity_url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
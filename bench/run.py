@@ -0,0 +1,404 @@
+"""Offline performance harness for the GEO pipelines.
+
+Starts the mock provider server, points Groq/Perplexity at it and runs
+scenario(s) against the real engine code, emitting machine-readable
+results: brands/sec, p50/p95/p99 per stage and peak memory.
+
+    python -m bench.run --scenario all --brands 200 --concurrency 16 --out bench_results.json
+    python -m bench.run --scenario bulk --rate-429 0.05 --rate-malformed 0.1
+    python -m bench.run --scenario audit --stream --rate-stall 0.05 --stream-ttft-timeout 2
+    python -m bench.run --scenario mixed --no-single-flight   # duplicate calls without coalescing
+    python -m bench.run --scenario audit --cascade llama-3.1-8b-instant,llama-3.3-70b-versatile --rate-weak 0.2
+    python -m bench.run --scenario audit --hedge --rate-slow 0.03
+"""
+import os
+import sys
+import json
+import asyncio
+import time
+import shutil
+import argparse
+import resource
+import tempfile
+import contextlib
+import subprocess
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from bench.mock_server import MockProviderServer, add_mock_arguments, settings_from_args
+
+SCENARIOS = ("bulk", "audit", "battle", "tournament", "mixed", "compete", "render", "startup")
+NICHES = ("Aerospace", "Fintech", "Cloud Software", "Retail", "Healthcare")
+
+
+def percentiles(samples) -> dict:
+    """Nearest-rank p50/p95/p99 (seconds) plus count and mean."""
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+
+    def rank(p):
+        return ordered[min(len(ordered) - 1, max(0, int(round(p / 100 * len(ordered))) - 1))]
+
+    return {
+        "count": len(ordered),
+        "mean": round(sum(ordered) / len(ordered), 4),
+        "p50": round(rank(50), 4),
+        "p95": round(rank(95), 4),
+        "p99": round(rank(99), 4),
+    }
+
+
+def memory_peak_mb() -> dict:
+    to_mb = 1 / 1024 if sys.platform != "darwin" else 1 / (1024 * 1024)
+    return {
+        "self": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * to_mb, 1),
+        "children": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * to_mb, 1),
+    }
+
+
+def _timed_map(func, items, workers):
+    latencies, failures = [], 0
+
+    def call(item):
+        started = time.perf_counter()
+        try:
+            func(item)
+            return time.perf_counter() - started, None
+        except Exception as e:
+            return time.perf_counter() - started, e
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for elapsed, error in pool.map(call, items):
+            latencies.append(elapsed)
+            failures += error is not None
+    return latencies, failures
+
+
+def _server_stages(server) -> dict:
+    snapshot = server.stats.snapshot()
+    return {
+        "provider_counts": snapshot["counts"],
+        "llm": percentiles(snapshot["latencies"]["llm"]),
+        "search": percentiles(snapshot["latencies"]["search"]),
+    }
+
+
+def _routing_delta(before: dict, after: dict) -> dict:
+    return {
+        model: {k: v - before.get(model, {}).get(k, 0) for k, v in counts.items()}
+        for model, counts in after.items()
+    }
+
+
+# --- scenarios ----------------------------------------------------------------
+
+def scenario_bulk(args, workdir: Path) -> dict:
+    import main
+    from core.config import Config
+
+    clients = Config.DATA_DIR / "clients.jsonl"
+    with open(clients, "w", encoding="utf-8") as f:
+        for i in range(args.brands):
+            f.write(json.dumps({"brand_name": f"Brand {i:05d}", "niche": NICHES[i % len(NICHES)]}) + "\n")
+
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(sys.stderr):
+        if args.mode == "sync":
+            stats = main.run_bulk_audits(run_id=f"bench-{int(started)}", batch_size=args.batch_size)
+        else:
+            stats = main.run_bulk_audits_async(concurrency=args.concurrency, run_id=f"bench-{int(started)}",
+                                               batch_size=args.batch_size)
+    elapsed = time.perf_counter() - started
+    return {
+        "mode": args.mode,
+        "brands": args.brands,
+        "succeeded": len(stats["success"]),
+        "failed": len(stats["failed"]),
+        "render_failed": len(stats.get("render_failed", [])),
+        "elapsed_s": round(elapsed, 3),
+        "brands_per_sec": round(args.brands / elapsed, 3),
+    }
+
+
+def scenario_audit(args, workdir: Path) -> dict:
+    from agents.auditor import GEOAuditor
+
+    auditor = GEOAuditor()
+    brands = [(f"Brand {i:05d}", NICHES[i % len(NICHES)]) for i in range(args.brands)]
+    started = time.perf_counter()
+    latencies, failures = _timed_map(lambda b: auditor.perform_audit(*b), brands, args.concurrency)
+    elapsed = time.perf_counter() - started
+    return {
+        "brands": len(brands),
+        "failed": failures,
+        "elapsed_s": round(elapsed, 3),
+        "brands_per_sec": round(len(brands) / elapsed, 3),
+        "perform_audit": percentiles(latencies),
+    }
+
+
+def scenario_battle(args, workdir: Path) -> dict:
+    import main
+
+    pairs = [(f"Rival {i:03d}A", f"Rival {i:03d}B") for i in range(args.repeat)]
+    latencies, failures = _timed_map(
+        lambda p: main.run_competitive_battle(p[0], p[1], "Aerospace", open_report=False), pairs, 1
+    )
+    return {"battles": len(pairs), "failed": failures, "run_competitive_battle": percentiles(latencies)}
+
+
+def scenario_tournament(args, workdir: Path) -> dict:
+    import main
+
+    brands = [f"Contender {i:03d}" for i in range(args.competitors)]
+    results = {}
+    for mode in ("ranking", "pairwise"):
+        latencies, failures = _timed_map(
+            lambda _: main.run_tournament(brands, "Aerospace", mode=mode, open_report=False), range(args.repeat), 1
+        )
+        results[mode] = {"failed": failures, "run_tournament": percentiles(latencies)}
+    return {"brands": len(brands), "runs": args.repeat, **results}
+
+
+def scenario_mixed(args, workdir: Path) -> dict:
+    """Bulk audits, battles and a search fan-out over the same brands, all at once."""
+    from agents.auditor import AsyncGEOAuditor, GEOAuditor
+    from tools.search import PerplexitySearch
+    from core.config import Config
+    from core.singleflight import singleflight_stats
+
+    brands = [f"Brand {i:05d}" for i in range(args.brands)]
+    before = singleflight_stats()
+
+    async def bulk():
+        auditor = AsyncGEOAuditor()
+        gate = asyncio.Semaphore(args.concurrency)
+
+        async def one(brand):
+            async with gate:
+                await auditor.perform_audit(brand, "Aerospace")
+
+        try:
+            return await asyncio.gather(*(one(b) for b in brands), return_exceptions=True)
+        finally:
+            await auditor.close()
+
+    def battles():
+        auditor = GEOAuditor()
+        return _timed_map(lambda b: auditor.perform_audit(b, "Aerospace"), brands, args.concurrency)
+
+    def searches():
+        search = PerplexitySearch()
+        # Two pipelines asking the same question side by side
+        return search.search_many([f"How visible is {b} in Aerospace?" for b in brands for _ in range(2)])
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        jobs = [pool.submit(asyncio.run, bulk()), pool.submit(battles), pool.submit(searches)]
+        bulk_results, (_, battle_failures), _ = [job.result() for job in jobs]
+    elapsed = time.perf_counter() - started
+
+    after = singleflight_stats()
+    coalesced = {name: counts.get("coalesced", 0) - before.get(name, {}).get("coalesced", 0)
+                 for name, counts in after.items()}
+    return {
+        "brands": len(brands),
+        "single_flight": Config.SINGLE_FLIGHT,
+        "failed": sum(isinstance(r, Exception) for r in bulk_results) + battle_failures,
+        "elapsed_s": round(elapsed, 3),
+        "coalesced": coalesced,
+    }
+
+
+def scenario_compete(args, workdir: Path) -> dict:
+    from agents.researcher import CompetitorAgent
+
+    agent = CompetitorAgent()
+    competitors = [f"Competitor {i}" for i in range(args.competitors)]
+    latencies, failures = _timed_map(
+        lambda i: agent.compare_brands(f"Client {i}", competitors, "Cloud Software"), range(args.repeat), 1
+    )
+    return {"mode": args.research_mode, "runs": args.repeat, "competitors": len(competitors), "failed": failures,
+            "compare_brands": percentiles(latencies)}
+
+
+def scenario_render(args, workdir: Path) -> dict:
+    """Single-core rendering throughput: one PDF per brand, then one portfolio per format."""
+    import tracemalloc
+    from bench.mock_server import _audit
+    from tools.render_stage import render_audit_pdf
+    from tools.portfolio import FORMATS, export_portfolio
+
+    out = workdir / "render"
+    out.mkdir(exist_ok=True)
+    latencies, failures = _timed_map(
+        lambda i: render_audit_pdf(_audit(f"Brand {i}"), str(out / f"r{i}.pdf")), range(args.repeat), 1
+    )
+    total = sum(latencies)
+    results = {"reports": args.repeat, "failed": failures,
+               "reports_per_sec": round(args.repeat / total, 2) if total else None, "render": percentiles(latencies)}
+
+    # Reports are generated lazily, as they would stream out of the audit ledger
+    def portfolio(fmt):
+        return export_portfolio((_audit(f"Brand {i}") for i in range(args.brands)), out / f"portfolio.{fmt}", fmt)
+
+    for fmt in FORMATS:
+        started = time.perf_counter()
+        files = portfolio(fmt)
+        elapsed = time.perf_counter() - started
+        # Traced separately: tracemalloc slows allocation-heavy PDF layout several times over
+        tracemalloc.start()
+        portfolio(fmt)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        results[f"portfolio_{fmt}"] = {
+            "brands": args.brands, "files": len(files), "elapsed_s": round(elapsed, 3),
+            "reports_per_sec": round(args.brands / elapsed, 2), "peak_traced_mb": round(peak / 2 ** 20, 2),
+        }
+    return results
+
+
+def scenario_startup(args, workdir: Path) -> dict:
+    """Wall time of `cli.py report` re-rendering cached JSON, and the CLI's own startup share."""
+    from bench.mock_server import _audit
+    from core.config import BASE_DIR, Config
+
+    source = workdir / "cached_audit.json"
+    source.write_text(json.dumps(_audit("Brand 0")), encoding="utf-8")
+    command = [sys.executable, str(BASE_DIR / "cli.py"), "--timings", "report", str(source),
+               "-o", str(workdir / "cached_audit.pdf")]
+
+    # `cli.py report` attaches the agency.log sink; keep it out of the repo's logs/
+    env = dict(os.environ, GEO_LOG_DIR=str(workdir / "logs"))
+
+    def wall(cmd):
+        started = time.perf_counter()
+        done = subprocess.run(cmd, capture_output=True, text=True, cwd=BASE_DIR, env=env)
+        return time.perf_counter() - started, done
+
+    interpreter, startup, total, failures = [], [], [], 0
+    for _ in range(args.repeat):
+        interpreter.append(wall([sys.executable, "-c", "pass"])[0])
+        elapsed, done = wall(command)
+        total.append(elapsed)
+        failures += done.returncode != 0
+        for line in done.stderr.splitlines():
+            if line.startswith("startup_ms="):
+                startup.append(float(line.split()[0].split("=")[1]) / 1000)
+    return {
+        "runs": args.repeat,
+        "failed": failures,
+        "budget_ms": Config.STARTUP_BUDGET_MS,
+        "within_budget": sum(s * 1000 <= Config.STARTUP_BUDGET_MS for s in startup),
+        "cli_startup": percentiles(startup),
+        "interpreter": percentiles(interpreter),
+        "report_total": percentiles(total),
+    }
+
+
+RUNNERS = {
+    "bulk": scenario_bulk,
+    "audit": scenario_audit,
+    "battle": scenario_battle,
+    "tournament": scenario_tournament,
+    "mixed": scenario_mixed,
+    "compete": scenario_compete,
+    "render": scenario_render,
+    "startup": scenario_startup,
+}
+
+
+def point_at_mock(server, rpm: float = 100000, tpm: float = 1e9, concurrency: int = 16):
+    """Routes Groq/Perplexity to the mock with bench-sized limits. Call before core.config is imported."""
+    os.environ["GROQ_BASE_URL"] = server.groq_base_url
+    os.environ["PERPLEXITY_BASE_URL"] = server.perplexity_url
+    os.environ["GROQ_API_KEY"] = "mock"
+    os.environ["PERPLEXITY_API_KEY"] = "mock"
+    os.environ["GEO_CACHE_BYPASS"] = "1"
+    for provider in ("GROQ", "PERPLEXITY"):
+        os.environ[f"GEO_{provider}_RPM"] = str(rpm)
+        os.environ[f"GEO_{provider}_TPM"] = str(tpm)
+        os.environ[f"GEO_{provider}_MAX_INFLIGHT"] = str(concurrency)
+
+
+def _configure_environment(server, args, workdir: Path):
+    """Points every provider at the mock and isolates data/ and reports/."""
+    point_at_mock(server, args.rpm, args.tpm, args.concurrency)
+    os.environ["GEO_STREAM"] = "1" if args.stream else "0"
+    os.environ["GEO_RESEARCH_MODE"] = args.research_mode
+    os.environ["GEO_STREAM_TTFT_TIMEOUT"] = str(args.stream_ttft_timeout)
+    os.environ["GEO_SINGLE_FLIGHT"] = "0" if args.no_single_flight else "1"
+    os.environ["GEO_MODEL_CASCADE"] = args.cascade or ""
+    os.environ["GEO_HEDGE"] = "1" if args.hedge else "0"
+
+    from loguru import logger
+    from core.config import Config
+
+    Config.DATA_DIR = workdir / "data"
+    Config.REPORTS_DIR = workdir / "reports"
+    Config.METRICS_FILE = workdir / "metrics.prom"
+    for directory in (Config.DATA_DIR, Config.REPORTS_DIR):
+        directory.mkdir(parents=True, exist_ok=True)
+    logger.remove()
+    logger.add(sys.stderr, level=args.log_level)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenario", choices=SCENARIOS + ("all",), default="all")
+    parser.add_argument("--mode", choices=("async", "sync"), default="async", help="Bulk engine mode")
+    parser.add_argument("--brands", type=int, default=50, help="Brands for bulk/audit/mixed and portfolio renders")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--batch-size", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=10, help="Iterations for battle/compete/render")
+    parser.add_argument("--competitors", type=int, default=4)
+    parser.add_argument("--research-mode", choices=("pipelined", "single"), default="pipelined",
+                        help="CompetitorAgent research mode for the compete scenario")
+    parser.add_argument("--rpm", type=float, default=100000)
+    parser.add_argument("--tpm", type=float, default=1e9)
+    parser.add_argument("--stream", action="store_true", help="Stream LLM responses (GEO_STREAM=1)")
+    parser.add_argument("--stream-ttft-timeout", type=float, default=10.0)
+    parser.add_argument("--no-single-flight", action="store_true", help="Don't coalesce duplicate in-flight calls")
+    parser.add_argument("--cascade", help="Comma-separated models, cheapest first (GEO_MODEL_CASCADE)")
+    parser.add_argument("--hedge", action="store_true", help="Hedge LLM calls slower than their rolling p95")
+    parser.add_argument("--log-level", default="WARNING")
+    parser.add_argument("--out", help="Write results JSON here as well as stdout")
+    add_mock_arguments(parser)
+    args = parser.parse_args(argv)
+
+    workdir = Path(tempfile.mkdtemp(prefix="geo-bench-"))
+    scenarios = SCENARIOS if args.scenario == "all" else (args.scenario,)
+    results = {"settings": vars(args), "scenarios": {}}
+
+    with MockProviderServer(settings_from_args(args)) as server:
+        _configure_environment(server, args, workdir)
+        try:
+            from core.telemetry import telemetry
+            from core.routing import routing_stats
+
+            for name in scenarios:
+                server.stats.reset()
+                telemetry.reset()
+                routing_before = routing_stats()
+                outcome = RUNNERS[name](args, workdir)
+                outcome["stages"] = _server_stages(server)
+                if args.stream:
+                    outcome["stages"]["ttft"] = telemetry.summary()["stages"].get("ttft", {})
+                if args.cascade or args.hedge:
+                    outcome["routing"] = _routing_delta(routing_before, routing_stats())
+                outcome["llm_cost_usd"] = round(sum(
+                    u["cost_usd"] for models in telemetry.summary()["tokens"].values() for u in models.values()
+                ), 6)
+                results["scenarios"][name] = outcome
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    results["memory_peak_mb"] = memory_peak_mb()
+    payload = json.dumps(results, indent=2, default=str)
+    print(payload)
+    if args.out:
+        Path(args.out).write_text(payload, encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+"""Command-line entry point for The GEO Agency engine.
+
+Each subcommand imports only what it needs, so quick operations such as
+re-rendering a report from cached JSON never pay for openai, pandas or
+the scheduler.
+
+    python cli.py audit --incremental
+    python cli.py battle SpaceX "Blue Origin" --niche Aerospace
+    python cli.py battle A B C D --niche Fintech --pairwise
+    python cli.py compete Acme "Rival One" "Rival Two" --niche "Cloud Software"
+    python cli.py report reports/Acme_Audit_20260101_0900.json
+    python cli.py portfolio --format html --niche Fintech
+    python cli.py audit --queue && python cli.py worker     # one worker per process/host
+    python cli.py --metrics-port worker                     # scrape /metrics on GEO_METRICS_PORT
+    python cli.py queue --requeue-dead
+    python cli.py bench --scenario bulk --brands 200
+"""
+import time
+
+_STARTED = time.perf_counter()
+
+import sys
+import json
+import argparse
+from pathlib import Path
+from core.config import Config
+
+
+# --- subcommands ----------------------------------------------------------------
+
+def _enqueue(kind, payload, dedupe_key=None):
+    from core.jobs import JobQueue
+
+    queue = JobQueue()
+    try:
+        job_id = queue.enqueue(kind, payload, dedupe_key=dedupe_key)
+    finally:
+        queue.close()
+    print(f"queued {kind} job {job_id}" if job_id else f"{kind} job already pending")
+    return job_id
+
+
+def cmd_audit(args):
+    if args.queue:
+        from core.jobs import JobQueue
+        from core.ingest import client_key, find_client_file, iter_clients
+
+        client_file = find_client_file()
+        if client_file is None:
+            raise SystemExit(f"Client file not found in {Config.DATA_DIR}")
+        incremental = Config.INCREMENTAL if args.incremental is None else args.incremental
+        queue = JobQueue()
+        try:
+            clients = ({**c, "incremental": incremental} for c in iter_clients(client_file))
+            added = queue.enqueue_many("audit", clients, key_fn=lambda c: f"audit:{client_key(c)}")
+        finally:
+            queue.close()
+        print(f"queued {added} audit jobs from {client_file.name}")
+        return added
+
+    import main
+
+    options = dict(run_id=args.run_id, resume=args.resume, batch_size=args.batch_size, incremental=args.incremental)
+    if (args.mode or Config.BULK_MODE) == "sync":
+        return main.run_bulk_audits(**options)
+    return main.run_bulk_audits_async(concurrency=args.concurrency, **options)
+
+
+def cmd_battle(args):
+    if len(args.brands) < 2:
+        raise SystemExit("battle needs at least two brands")
+    if args.queue:
+        mode = "pairwise" if args.pairwise else ("ranking" if len(args.brands) > 2 else "battle")
+        return _enqueue("battle", {"brands": args.brands, "niche": args.niche, "mode": mode})
+    import main
+
+    if len(args.brands) == 2 and not args.pairwise:
+        return main.run_competitive_battle(*args.brands, args.niche, open_report=not args.no_open)
+    return main.run_tournament(args.brands, args.niche, mode="pairwise" if args.pairwise else "ranking",
+                               open_report=not args.no_open)
+
+
+def cmd_compete(args):
+    if args.queue:
+        return _enqueue("compete", {"client": args.client, "competitors": args.competitors,
+                                    "niche": args.niche, "mode": args.mode})
+    import main
+
+    return main.run_competitor_research(args.client, args.competitors, args.niche, mode=args.mode)
+
+
+def cmd_worker(args):
+    import main
+
+    kinds = args.kinds.split(",") if args.kinds else None
+    return main.run_worker(worker_id=args.id, kinds=kinds, max_jobs=args.max_jobs, drain=args.drain)
+
+
+def cmd_queue(args):
+    from core.jobs import JobQueue
+
+    queue = JobQueue()
+    try:
+        if args.requeue_dead:
+            print(f"requeued {queue.requeue_dead()} dead jobs")
+        print(json.dumps({"path": str(queue.path), **queue.stats()}))
+    finally:
+        queue.close()
+
+
+def cmd_report(args):
+    """Re-renders a PDF from an audit, battle or tournament JSON (e.g. one kept after a render failure)."""
+    source = Path(args.source)
+    if not source.exists():
+        raise SystemExit(f"{source} not found")
+    data = json.loads(source.read_text(encoding="utf-8"))
+    output = args.output or str(source.with_suffix(".pdf"))
+
+    from tools.reporter import GEOReporter
+
+    reporter = GEOReporter()
+    if "standings" in data:
+        reporter.generate_tournament_report(data, output)
+    elif "brand_a" in data and "brand_b" in data:
+        reporter.generate_battle_report(data["brand_a"], data["brand_b"], data.get("winner_summary", ""), output)
+    elif "brand_name" in data:
+        reporter.generate_report(data, output)
+    else:
+        raise SystemExit(f"{source} is not an audit, battle or tournament report")
+    return output
+
+
+def cmd_portfolio(args):
+    import main
+
+    for path in main.run_portfolio(args.format, args.output, args.niche):
+        print(path)
+
+
+def cmd_bench(args):
+    import subprocess
+
+    # A fresh interpreter: this one already loaded Config, so the bench's
+    # mock endpoints and limits set through os.environ would never apply
+    command = [sys.executable, "-m", "bench.run", *args.bench_args]
+    sys.exit(subprocess.call(command, cwd=Path(__file__).resolve().parent))
+
+
+# --- parser -----------------------------------------------------------------------
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="geo", description=f"{Config.AGENCY_NAME} engine")
+    parser.add_argument("--timings", action="store_true", help="Print CLI startup time to stderr")
+    parser.add_argument("--metrics-port", type=int, nargs="?", const=Config.METRICS_PORT,
+                        help=f"Serve Prometheus /metrics while the command runs (default port {Config.METRICS_PORT})")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    audit = commands.add_parser("audit", help="Bulk-audit every client in data/clients.jsonl")
+    audit.add_argument("--run-id", help="Journal ID for this bulk run (defaults to a timestamp)")
+    audit.add_argument("--resume", action="store_true", help="Skip brands already completed in the run")
+    audit.add_argument("--batch-size", type=int, help="Brands per batched audit request (default GEO_AUDIT_BATCH_SIZE)")
+    audit.add_argument("--incremental", action=argparse.BooleanOptionalAction, default=None,
+                       help="Only re-audit brands whose inputs changed or whose last audit is stale "
+                            "(default GEO_INCREMENTAL)")
+    audit.add_argument("--mode", choices=("async", "sync"), help="Bulk engine (default GEO_BULK_MODE)")
+    audit.add_argument("--concurrency", type=int, help="In-flight audits for the async engine")
+    audit.add_argument("--queue", action="store_true", help="Enqueue one job per client for `worker` processes")
+    audit.set_defaults(handler=cmd_audit)
+
+    battle = commands.add_parser("battle", help="Head-to-head battle, or a league for three or more brands")
+    battle.add_argument("brands", nargs="+", help="Two brands for a battle, more for a tournament")
+    battle.add_argument("--niche", required=True)
+    battle.add_argument("--pairwise", action="store_true", help="Rank by round-robin matches instead of one ranking call")
+    battle.add_argument("--no-open", action="store_true", help="Don't open the PDF when done")
+    battle.add_argument("--queue", action="store_true", help="Enqueue for a worker instead of running here")
+    battle.set_defaults(handler=cmd_battle)
+
+    compete = commands.add_parser("compete", help="Live gap analysis of a client against its competitors")
+    compete.add_argument("client")
+    compete.add_argument("competitors", nargs="+")
+    compete.add_argument("--niche", required=True)
+    compete.add_argument("--mode", choices=("single", "pipelined"), help="Research mode (default GEO_RESEARCH_MODE)")
+    compete.add_argument("--queue", action="store_true", help="Enqueue for a worker instead of running here")
+    compete.set_defaults(handler=cmd_compete)
+
+    worker = commands.add_parser("worker", help="Run queued jobs (start one per process or host)")
+    worker.add_argument("--id", help="Worker name in leases (default host:pid)")
+    worker.add_argument("--kinds", help="Comma-separated job kinds to take (audit,battle,compete)")
+    worker.add_argument("--max-jobs", type=int, help="Exit after this many jobs")
+    worker.add_argument("--drain", action="store_true", help="Exit once nothing is runnable")
+    worker.set_defaults(handler=cmd_worker)
+
+    queue = commands.add_parser("queue", help="Show job queue counts")
+    queue.add_argument("--requeue-dead", action="store_true", help="Give dead-lettered jobs a fresh set of attempts")
+    queue.set_defaults(handler=cmd_queue)
+
+    report = commands.add_parser("report", help="Re-render a PDF from cached report JSON")
+    report.add_argument("source", help="Audit, battle or tournament JSON")
+    report.add_argument("-o", "--output", help="PDF path (defaults next to the JSON)")
+    report.set_defaults(handler=cmd_report)
+
+    portfolio = commands.add_parser("portfolio", help="One consolidated report of every audited brand")
+    portfolio.add_argument("--format", choices=("pdf", "html", "json"), default="pdf")
+    portfolio.add_argument("--niche", help="Only brands audited in this niche")
+    portfolio.add_argument("-o", "--output", help="Output path (PDFs over GEO_PORTFOLIO_VOLUME brands are split into volumes)")
+    portfolio.set_defaults(handler=cmd_portfolio)
+
+    # Everything after `bench` is handed to bench.run untouched
+    bench = commands.add_parser("bench", help="Offline benchmark harness (arguments go to bench.run)", add_help=False)
+    bench.set_defaults(handler=cmd_bench)
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args, extra = parser.parse_known_args(argv)
+    if args.command == "bench":
+        args.bench_args = extra
+    elif extra:
+        parser.error(f"unrecognized arguments: {' '.join(extra)}")
+
+    # Everything up to here is the fixed cost of every command (measured once per process)
+    global _STARTED
+    if _STARTED is not None:
+        startup_ms = (time.perf_counter() - _STARTED) * 1000
+        _STARTED = None
+        if args.timings or startup_ms > Config.STARTUP_BUDGET_MS:
+            print(f"startup_ms={startup_ms:.1f} budget_ms={Config.STARTUP_BUDGET_MS:.0f}", file=sys.stderr)
+
+    if args.command != "bench":
+        Config.setup_logging()
+    if args.metrics_port and args.command != "bench":
+        from core.telemetry import start_metrics_server
+
+        start_metrics_server(args.metrics_port)
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
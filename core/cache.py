@@ -0,0 +1,160 @@
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import Counter
+from typing import Optional
+from loguru import logger
+from core.config import Config
+
+# Eviction frees down to this share of the cap, so the next few puts don't evict again
+_LOW_WATER = 0.9
+
+
+class LLMCache:
+    """Content-addressed, on-disk cache for chat completions.
+
+    Entries are keyed by a hash of (endpoint, model, messages, response_format)
+    and live in a single SQLite file under Config.DATA_DIR. Each method gets its
+    own TTL and the file is kept under a byte cap by evicting the least recently
+    used rows. The footprint is tracked as a running total and only recounted
+    when it looks over the cap (other processes may share the file).
+    """
+
+    def __init__(self, path=None, max_bytes=None, ttls=None, bypass=None):
+        self.path = path or Config.DATA_DIR / "llm_cache.sqlite"
+        self.max_bytes = max_bytes if max_bytes is not None else Config.CACHE_MAX_BYTES
+        self.ttls = ttls if ttls is not None else Config.CACHE_TTLS
+        self.bypass = Config.CACHE_BYPASS if bypass is None else bypass
+
+        self.hits = Counter()
+        self.misses = Counter()
+        self._lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS completions ("
+            " key TEXT PRIMARY KEY,"
+            " method TEXT NOT NULL,"
+            " value TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_access ON completions(last_access)")
+        self._conn.commit()
+        self._bytes = self._total_bytes()
+
+    def _total_bytes(self) -> int:
+        return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM completions").fetchone()[0]
+
+    @staticmethod
+    def make_key(endpoint: str, model: str, messages: list, response_format: Optional[dict] = None) -> str:
+        """Stable SHA-256 over everything that determines the model's answer."""
+        payload = json.dumps(
+            {"endpoint": endpoint, "model": model, "messages": messages, "response_format": response_format},
+            sort_keys=True, ensure_ascii=False, separators=(",", ":")
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, method: str, key: str) -> Optional[str]:
+        """Returns the cached completion, or None on a miss / expiry / bypass."""
+        if self.bypass:
+            return None
+
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at, size FROM completions WHERE key = ?", (key,)
+            ).fetchone()
+
+            ttl = self.ttls.get(method, Config.CACHE_DEFAULT_TTL)
+            if row is None or now - row[1] > ttl:
+                if row is not None:
+                    self._conn.execute("DELETE FROM completions WHERE key = ?", (key,))
+                    self._conn.commit()
+                    self._bytes -= row[2]
+                self.misses[method] += 1
+                return None
+
+            self._conn.execute("UPDATE completions SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits[method] += 1
+
+        logger.debug(f"💾 Cache hit for {method} ({key[:12]})")
+        return row[0]
+
+    def put(self, method: str, key: str, value: str):
+        """Stores a completion and evicts LRU entries if the cap is exceeded."""
+        if self.bypass:
+            return
+
+        now = time.time()
+        size = len(value.encode("utf-8"))
+        with self._lock:
+            old = self._conn.execute("SELECT size FROM completions WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO completions (key, method, value, size, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, method, value, size, now, now)
+            )
+            self._bytes += size - (old[0] if old else 0)
+            if self._bytes > self.max_bytes:
+                self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        # Recount first: another process may already have evicted
+        self._bytes = self._total_bytes()
+        if self._bytes <= self.max_bytes:
+            return
+
+        excess = self._bytes - int(self.max_bytes * _LOW_WATER)
+        freed, victims = 0, []
+        for key, size in self._conn.execute("SELECT key, size FROM completions ORDER BY last_access ASC"):
+            victims.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        self._conn.executemany("DELETE FROM completions WHERE key = ?", victims)
+        self._bytes -= freed
+        logger.info(f"🧹 Evicted {len(victims)} cached completions ({freed} bytes)")
+
+    def stats(self) -> dict:
+        """Hit/miss counters per method plus the current footprint."""
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM completions"
+            ).fetchone()
+        return {
+            "hits": dict(self.hits),
+            "misses": dict(self.misses),
+            "entries": entries,
+            "bytes": size,
+        }
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM completions")
+            self._conn.commit()
+            self._bytes = 0
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+def get_llm_cache() -> LLMCache:
+    """Process-wide cache so bulk runs and battles share hits."""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = LLMCache()
+        return _default_cache
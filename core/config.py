@@ -1,37 +1,153 @@
 import os
 from pathlib import Path
 from dotenv import load_dotenv
-from loguru import logger
 
 # 1. Dynamically find the Project Root (where .env lives)
 # Path(__file__) is the current file, .parent is 'core/', .parent.parent is root
 BASE_DIR = Path(__file__).resolve().parent.parent
 
-# 2. Load Environment Variables
+# 2. Load Environment Variables (before the class body below reads them)
 load_dotenv(BASE_DIR / ".env")
 
 class Config:
     # --- API Keys ---
     OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
     PERPLEXITY_API_KEY = os.getenv("PERPLEXITY_API_KEY")
+    GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+
+    # --- Groq Endpoint ---
+    GROQ_BASE_URL = os.getenv("GROQ_BASE_URL", "https://api.groq.com/openai/v1")
+    GROQ_MODEL = os.getenv("GROQ_MODEL", "llama-3.3-70b-versatile")
     
     # --- Paths ---
     DATA_DIR = BASE_DIR / "data"
     REPORTS_DIR = BASE_DIR / "reports"
-    LOGS_DIR = BASE_DIR / "logs"
+    LOGS_DIR = Path(os.getenv("GEO_LOG_DIR", BASE_DIR / "logs"))
     
     # --- Agency Settings ---
     AGENCY_NAME = "The GEO Agency"
     DEFAULT_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o")
 
+    # --- Bulk Engine ---
+    BULK_MODE = os.getenv("GEO_BULK_MODE", "async")  # "async" or "sync"
+    BULK_CONCURRENCY = int(os.getenv("GEO_BULK_CONCURRENCY", "8"))
+    BRAND_TIMEOUT = float(os.getenv("GEO_BRAND_TIMEOUT", "120"))
+    AUDIT_BATCH_SIZE = int(os.getenv("GEO_AUDIT_BATCH_SIZE", "1"))  # >1 packs same-niche brands per request
+    INCREMENTAL = os.getenv("GEO_INCREMENTAL", "0") == "1"
+    STALENESS_HOURS = float(os.getenv("GEO_STALENESS_HOURS", "168"))  # re-audit unchanged brands weekly
+
+    # --- Perplexity Transport ---
+    SEARCH_MAX_WORKERS = int(os.getenv("GEO_SEARCH_WORKERS", "8"))
+    SEARCH_CONNECT_TIMEOUT = 5.0
+    SEARCH_READ_TIMEOUT = float(os.getenv("GEO_SEARCH_READ_TIMEOUT", "60"))
+    SEARCH_MAX_RETRIES = 4
+    SEARCH_BACKOFF_BASE = 1.0
+    SEARCH_BACKOFF_CAP = 30.0
+
+    # --- Competitor Research ---
+    RESEARCH_MODE = os.getenv("GEO_RESEARCH_MODE", "single")  # "single" query or "pipelined" fan-out
+    RESEARCH_TOPICS = ["pricing", "integrations", "customer reviews", "alternatives and comparisons"]
+
+    # --- Provider Scheduler (requests/min, tokens/min, max in-flight) ---
+    PROVIDER_LIMITS = {
+        "groq": {
+            "rpm": float(os.getenv("GEO_GROQ_RPM", "30")),
+            "tpm": float(os.getenv("GEO_GROQ_TPM", "12000")),
+            "max_concurrency": int(os.getenv("GEO_GROQ_MAX_INFLIGHT", "32")),
+        },
+        "perplexity": {
+            "rpm": float(os.getenv("GEO_PERPLEXITY_RPM", "50")),
+            "tpm": float(os.getenv("GEO_PERPLEXITY_TPM", "100000")),
+            "max_concurrency": int(os.getenv("GEO_PERPLEXITY_MAX_INFLIGHT", "16")),
+        },
+    }
+    SCHED_LATENCY_BACKOFF = 2.0  # shrink concurrency when latency doubles vs. its long-run baseline
+    SCHED_EST_COMPLETION_TOKENS = 800
+    LLM_MAX_RETRIES = 4
+    PARSE_MODEL_RETRIES = 1  # fresh generations after local JSON repair fails
+
+    # --- Model Routing ---
+    # Cheapest first, e.g. "llama-3.1-8b-instant,llama-3.3-70b-versatile"; empty means GROQ_MODEL only
+    MODEL_CASCADE = [m.strip() for m in os.getenv("GEO_MODEL_CASCADE", "").split(",") if m.strip()]
+    HEDGE_REQUESTS = os.getenv("GEO_HEDGE", "0").lower() in ("1", "true", "yes")
+    HEDGE_QUANTILE = 0.95  # a backup request goes out once a call is slower than this rolling quantile
+    HEDGE_WINDOW = 200  # latency samples kept per model
+    HEDGE_MIN_SAMPLES = 20  # no hedging until the window is this full
+    HEDGE_MIN_DELAY = 0.25
+    HEDGE_MAX_FRACTION = 0.1  # at most this share of calls get a backup
+    HEDGE_POOL_SIZE = 64
+
+    # --- Streaming Completions ---
+    STREAM_RESPONSES = os.getenv("GEO_STREAM", "0").lower() in ("1", "true", "yes")
+    STREAM_FIRST_TOKEN_TIMEOUT = float(os.getenv("GEO_STREAM_TTFT_TIMEOUT", "10"))  # also the max gap between chunks
+    STREAM_TOTAL_TIMEOUT = float(os.getenv("GEO_STREAM_TOTAL_TIMEOUT", "90"))
+
+    # --- Visibility History (Parquet) ---
+    HISTORY_FLUSH_ROWS = 500
+
+    # --- Portfolio Reports ---
+    PORTFOLIO_VOLUME_BRANDS = int(os.getenv("GEO_PORTFOLIO_VOLUME", "250"))  # brands per PDF volume (bounds memory)
+
+    # --- Telemetry ---
+    METRICS_FILE = LOGS_DIR / "metrics.prom"
+    METRICS_PORT = int(os.getenv("GEO_METRICS_PORT", "9464"))
+    MODEL_PRICING = {  # USD per 1M tokens: (prompt, completion)
+        "llama-3.3-70b-versatile": (0.59, 0.79),
+        "llama-3.1-8b-instant": (0.05, 0.08),
+        "sonar-pro": (3.00, 15.00),
+    }
+
+    # --- Ground-Truth Retrieval ---
+    RETRIEVAL_MIN_CHARS = 4000  # smaller corpora are sent to the model whole
+    RETRIEVAL_TOP_K = 8
+    RETRIEVAL_CHUNK_WORDS = 120
+    RETRIEVAL_CHUNK_OVERLAP = 20
+
+    # --- In-flight Deduplication ---
+    SINGLE_FLIGHT = os.getenv("GEO_SINGLE_FLIGHT", "1") == "1"  # identical concurrent audits/searches share one call
+
+    # --- LLM Response Cache ---
+    CACHE_BYPASS = os.getenv("GEO_CACHE_BYPASS", "0") == "1"
+    CACHE_MAX_BYTES = int(os.getenv("GEO_CACHE_MAX_MB", "256")) * 1024 * 1024
+    CACHE_DEFAULT_TTL = 24 * 3600
+    CACHE_TTLS = {  # seconds, per GEOAuditor method
+        "perform_audit": 24 * 3600,
+        "compare_brands": 24 * 3600,
+        "rank_brands": 24 * 3600,
+        "perform_batch_audit": 24 * 3600,
+        "detect_hallucinations": 7 * 24 * 3600,
+    }
+
+    # --- Job Queue (shared by every worker process/host) ---
+    QUEUE_PATH = Path(os.getenv("GEO_QUEUE_PATH", str(DATA_DIR / "jobs.sqlite")))
+    QUEUE_LEASE_SECONDS = float(os.getenv("GEO_QUEUE_LEASE_SECONDS", "300"))  # renewed by heartbeats every third
+    QUEUE_MAX_ATTEMPTS = int(os.getenv("GEO_QUEUE_MAX_ATTEMPTS", "3"))  # then the job is dead-lettered
+    QUEUE_RETRY_BACKOFF = 30.0  # seconds before the first retry, doubled per attempt
+    QUEUE_RETRY_CAP = 900.0
+    QUEUE_POLL_SECONDS = 2.0  # idle wait between claims
+
+    # --- CLI ---
+    STARTUP_BUDGET_MS = float(os.getenv("GEO_STARTUP_BUDGET_MS", "50"))  # argument parsing + dispatch
+
+    _log_sink = None
+
     @classmethod
     def initialize_directories(cls):
         """Ensures all necessary folders exist on startup."""
+        from loguru import logger
+
         dirs = [cls.DATA_DIR, cls.REPORTS_DIR, cls.LOGS_DIR]
         for directory in dirs:
             if not directory.exists():
                 directory.mkdir(parents=True, exist_ok=True)
                 logger.info(f"Created directory: {directory.relative_to(BASE_DIR)}")
 
-# Initialize logs immediately
-logger.add(Config.LOGS_DIR / "agency.log", rotation="1 MB", level="INFO")
\ No newline at end of file
+    @classmethod
+    def setup_logging(cls, level: str = "INFO"):
+        """Attaches the rotating agency.log sink. Entry points call this; importing Config does not."""
+        from loguru import logger
+
+        if cls._log_sink is None:
+            cls.LOGS_DIR.mkdir(parents=True, exist_ok=True)
+            cls._log_sink = logger.add(cls.LOGS_DIR / "agency.log", rotation="1 MB", level=level)
+        return cls._log_sink
@@ -0,0 +1,202 @@
+import uuid
+import threading
+from datetime import datetime
+from urllib.parse import quote
+from typing import List, Optional
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from loguru import logger
+from core.config import Config
+from core.schemas import AuditReport, CompetitorAnalysis
+
+TABLES = ("audits", "citations", "competitors")
+
+# date/niche are the hive partition keys, not columns in the files. Every part
+# is written with these types, so an all-None column (a battle's run_id)
+# can't come out as Parquet null and clash with string parts on read.
+_PARTITIONS = [pa.field("date", pa.string()), pa.field("niche", pa.string())]
+SCHEMAS = {
+    "audits": pa.schema([
+        pa.field("ts", pa.timestamp("us")),
+        pa.field("run_id", pa.string()),
+        pa.field("brand_name", pa.string()),
+        pa.field("visibility_score", pa.float64()),
+        pa.field("citation_count", pa.int64()),
+        pa.field("hallucination_count", pa.int64()),
+    ]),
+    "citations": pa.schema([
+        pa.field("ts", pa.timestamp("us")),
+        pa.field("brand_name", pa.string()),
+        pa.field("source", pa.string()),
+        pa.field("sentiment", pa.string()),
+    ]),
+    "competitors": pa.schema([
+        pa.field("ts", pa.timestamp("us")),
+        pa.field("client_brand", pa.string()),
+        pa.field("market_query", pa.string()),
+        pa.field("brand_name", pa.string()),
+        pa.field("rank", pa.int64()),
+        pa.field("citation_count", pa.int64()),
+        pa.field("sentiment_score", pa.float64()),
+    ]),
+}
+
+
+class VisibilityStore:
+    """Append-only, partitioned Parquet history of audits and competitor analyses.
+
+    Layout: data/history/<table>/date=YYYY-MM-DD/niche=<niche>/part-*.parquet
+    Rows are buffered and written per partition on flush(), so a bulk run
+    produces a handful of files instead of one per brand. All queries are
+    plain pandas group-bys over the needed columns; no model calls.
+    """
+
+    def __init__(self, root=None, flush_every: int = None):
+        self.root = root or Config.DATA_DIR / "history"
+        self.flush_every = flush_every or Config.HISTORY_FLUSH_ROWS
+        self._buffers = {table: [] for table in TABLES}
+        self._lock = threading.Lock()
+
+    # --- ingestion ---
+    def append_audit(self, report: AuditReport, niche: str, run_id: str = None, audited_at: datetime = None):
+        ts = audited_at or datetime.now()
+        date = ts.strftime("%Y-%m-%d")
+        hallucinations = report.hallucinations or []
+        with self._lock:
+            self._buffers["audits"].append({
+                "date": date, "niche": niche, "ts": ts, "run_id": run_id,
+                "brand_name": report.brand_name,
+                "visibility_score": float(report.visibility_score),
+                "citation_count": len(report.citations),
+                "hallucination_count": len(hallucinations),
+            })
+            for citation in report.citations:
+                self._buffers["citations"].append({
+                    "date": date, "niche": niche, "ts": ts,
+                    "brand_name": report.brand_name,
+                    "source": str(citation.get("source", "unknown")),
+                    "sentiment": str(citation.get("sentiment", "unknown")).lower(),
+                })
+            pending = len(self._buffers["audits"])
+        if pending >= self.flush_every:
+            self.flush()
+
+    def append_competitor_analysis(self, analysis: CompetitorAnalysis, niche: str, client_brand: str = None,
+                                   analyzed_at: datetime = None):
+        ts = analyzed_at or datetime.now()
+        date = ts.strftime("%Y-%m-%d")
+        with self._lock:
+            for rank, metrics in enumerate(analysis.leaderboard, 1):
+                self._buffers["competitors"].append({
+                    "date": date, "niche": niche, "ts": ts,
+                    "client_brand": client_brand,
+                    "market_query": analysis.market_query,
+                    "brand_name": metrics.brand_name,
+                    "rank": rank,
+                    "citation_count": metrics.citation_count,
+                    "sentiment_score": float(metrics.sentiment_score),
+                })
+
+    def flush(self):
+        """Writes buffered rows, one Parquet file per (table, date, niche)."""
+        with self._lock:
+            buffers = {table: rows for table, rows in self._buffers.items() if rows}
+            self._buffers = {table: [] for table in TABLES}
+
+        for table, rows in buffers.items():
+            frame = pd.DataFrame.from_records(rows)
+            for (date, niche), part in frame.groupby(["date", "niche"], sort=False):
+                folder = self.root / table / f"date={date}" / f"niche={quote(str(niche), safe='')}"
+                folder.mkdir(parents=True, exist_ok=True)
+                rows_table = pa.Table.from_pandas(part.drop(columns=["date", "niche"]), schema=SCHEMAS[table],
+                                                  preserve_index=False)
+                pq.write_table(rows_table, folder / f"part-{uuid.uuid4().hex}.parquet")
+            logger.debug(f"🗄️ Flushed {len(rows)} rows to history/{table}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.flush()
+
+    # --- queries ---
+    def load(self, table: str, columns: Optional[List[str]] = None, niche: str = None,
+             since: str = None, until: str = None) -> pd.DataFrame:
+        """Reads a table, pruning partitions by niche and date range."""
+        path = self.root / table
+        if not path.exists():
+            return pd.DataFrame(columns=columns or [])
+
+        filters = []
+        if niche is not None:
+            filters.append(("niche", "=", niche))
+        if since is not None:
+            filters.append(("date", ">=", since))
+        if until is not None:
+            filters.append(("date", "<=", until))
+
+        schema = pa.schema(list(SCHEMAS[table]) + _PARTITIONS)
+        frame = pd.read_parquet(path, columns=columns, filters=filters or None, schema=schema)
+        for col in ("date", "niche"):
+            if col in frame.columns:
+                frame[col] = frame[col].astype(str)
+        return frame
+
+    def visibility_trend(self, brand: str = None, niche: str = None, freq: str = "D",
+                         since: str = None, until: str = None) -> pd.DataFrame:
+        """Mean/min/max visibility score per brand per period (D, W, M...)."""
+        frame = self.load("audits", ["date", "niche", "brand_name", "visibility_score"], niche, since, until)
+        if brand is not None:
+            frame = frame[frame["brand_name"] == brand]
+        if frame.empty:
+            return frame
+        frame["period"] = pd.to_datetime(frame["date"]).dt.to_period(freq).dt.start_time
+        return (frame.groupby(["brand_name", "period"])["visibility_score"]
+                .agg(["mean", "min", "max", "count"]).reset_index())
+
+    def share_of_model(self, niche: str, since: str = None, until: str = None) -> pd.DataFrame:
+        """Each brand's share of all citations in a niche (Share of Model)."""
+        frame = self.load("audits", ["date", "niche", "brand_name", "citation_count"], niche, since, until)
+        if frame.empty:
+            return frame
+        totals = frame.groupby("brand_name")["citation_count"].sum()
+        share = (totals / totals.sum()).rename("share_of_model")
+        return pd.concat([totals, share], axis=1).sort_values("share_of_model", ascending=False).reset_index()
+
+    def citations_by_source(self, niche: str = None, brand: str = None, top: int = 20,
+                            since: str = None, until: str = None) -> pd.DataFrame:
+        """Citation counts per source, split by sentiment."""
+        frame = self.load("citations", ["date", "niche", "brand_name", "source", "sentiment"], niche, since, until)
+        if brand is not None:
+            frame = frame[frame["brand_name"] == brand]
+        if frame.empty:
+            return frame
+        table = pd.crosstab(frame["source"], frame["sentiment"])
+        table["total"] = table.sum(axis=1)
+        return table.sort_values("total", ascending=False).head(top).reset_index()
+
+    def hallucination_rates(self, since: str = None, until: str = None) -> pd.DataFrame:
+        """Share of audits with at least one hallucination, and mean count, per niche."""
+        frame = self.load("audits", ["date", "niche", "hallucination_count"], since=since, until=until)
+        if frame.empty:
+            return frame
+        frame["has_hallucination"] = frame["hallucination_count"] > 0
+        return (frame.groupby("niche")
+                .agg(audits=("hallucination_count", "size"),
+                     hallucination_rate=("has_hallucination", "mean"),
+                     mean_hallucinations=("hallucination_count", "mean"))
+                .sort_values("hallucination_rate", ascending=False).reset_index())
+
+    def competitor_leaderboard(self, niche: str = None, since: str = None, until: str = None) -> pd.DataFrame:
+        """Aggregated competitor standings across every stored CompetitorAnalysis."""
+        frame = self.load("competitors", ["date", "niche", "brand_name", "rank", "citation_count", "sentiment_score"],
+                          niche, since, until)
+        if frame.empty:
+            return frame
+        return (frame.groupby("brand_name")
+                .agg(appearances=("rank", "size"),
+                     mean_rank=("rank", "mean"),
+                     citations=("citation_count", "sum"),
+                     mean_sentiment=("sentiment_score", "mean"))
+                .sort_values(["citations", "mean_rank"], ascending=[False, True]).reset_index())
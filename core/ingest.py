@@ -0,0 +1,174 @@
+import os
+import json
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator, List, Optional
+from loguru import logger
+from core.config import Config
+
+READ_CHUNK = 64 * 1024
+
+
+def client_key(client: dict) -> str:
+    """Identity of a client row inside a run journal."""
+    return f"{client['brand_name']}|{client['niche']}"
+
+
+def _iter_json_lines(path: Path) -> Iterator[dict]:
+    with open(path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                logger.error(f"Skipping malformed client on line {line_no}: {e}")
+
+
+def _iter_json_array(path: Path) -> Iterator[dict]:
+    """Yields the elements of a top-level JSON array without loading the whole file."""
+    decoder = json.JSONDecoder()
+    with open(path, "r", encoding="utf-8") as f:
+        buffer, started, eof = "", False, False
+        while True:
+            if not eof and len(buffer) < READ_CHUNK:
+                chunk = f.read(READ_CHUNK)
+                eof = not chunk
+                buffer += chunk
+
+            buffer = buffer.lstrip()
+            if not started:
+                if not buffer:
+                    if eof:
+                        return
+                    continue
+                if buffer[0] != "[":
+                    raise ValueError(f"{path.name} must contain a JSON array of clients")
+                buffer, started = buffer[1:], True
+                continue
+
+            if buffer[:1] == ",":
+                buffer = buffer[1:]
+                continue
+            if buffer[:1] == "]":
+                return
+            if not buffer:
+                if eof:
+                    raise ValueError(f"{path.name} ended before the client array was closed")
+                continue
+
+            try:
+                item, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                # Object straddles the chunk boundary: read more and try again
+                chunk = f.read(READ_CHUNK)
+                eof = not chunk
+                buffer += chunk
+                continue
+            yield item
+            buffer = buffer[end:]
+
+
+def iter_clients(path: Path) -> Iterator[dict]:
+    """Streams client rows from JSON Lines (.jsonl) or a JSON array (.json)."""
+    if path.suffix == ".jsonl":
+        return _iter_json_lines(path)
+    return _iter_json_array(path)
+
+
+def iter_niche_batches(clients: Iterator[dict], size: int) -> Iterator[List[dict]]:
+    """Groups a client stream into same-niche batches of up to `size`.
+
+    Only one partial batch per niche is held in memory; leftovers are
+    flushed once the stream ends.
+    """
+    pending = {}
+    for client in clients:
+        batch = pending.setdefault(client['niche'], [])
+        batch.append(client)
+        if len(batch) >= size:
+            yield pending.pop(client['niche'])
+    yield from pending.values()
+
+
+def find_client_file() -> Optional[Path]:
+    """Prefers data/clients.jsonl, falls back to data/clients.json."""
+    for name in ("clients.jsonl", "clients.json"):
+        candidate = Config.DATA_DIR / name
+        if candidate.exists():
+            return candidate
+    return None
+
+
+class ProgressJournal:
+    """Durable, append-only per-brand progress log for one bulk run.
+
+    Each finished brand is written as one fsync'ed JSON line under
+    data/runs/<run_id>.jsonl, so a crashed run can be resumed and only
+    the failed or missing brands are audited again.
+    """
+
+    def __init__(self, run_id: str = None, resume: bool = False):
+        self.runs_dir = Config.DATA_DIR / "runs"
+        self.runs_dir.mkdir(parents=True, exist_ok=True)
+
+        if resume and run_id is None:
+            run_id = self.latest_run_id()
+            if run_id is None:
+                logger.warning("No previous run to resume, starting a fresh one")
+        self.run_id = run_id or datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.path = self.runs_dir / f"{self.run_id}.jsonl"
+
+        self.completed = self._load_completed() if resume else set()
+        if resume:
+            logger.info(f"♻️ Resuming run {self.run_id}: {len(self.completed)} brands already done")
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def latest_run_id(self) -> Optional[str]:
+        journals = sorted(self.runs_dir.glob("*.jsonl"), key=lambda p: p.stat().st_mtime)
+        return journals[-1].stem if journals else None
+
+    def _load_completed(self) -> set:
+        done = set()
+        if not self.path.exists():
+            return done
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # torn last line from a crash
+                # Later entries win, so a retried failure that succeeded counts as done
+                if entry.get("status") in ("success", "reused"):
+                    done.add(entry["key"])
+                else:
+                    done.discard(entry["key"])
+        return done
+
+    def pending(self, clients: Iterator[dict]) -> Iterator[dict]:
+        """Filters out clients already completed in this run."""
+        for client in clients:
+            if client_key(client) in self.completed:
+                continue
+            yield client
+
+    def record(self, client: dict, status: str, error: str = None):
+        entry = {
+            "key": client_key(client),
+            "status": status,
+            "error": error,
+            "ts": datetime.now().isoformat(timespec="seconds"),
+        }
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
@@ -0,0 +1,310 @@
+import os
+import json
+import time
+import socket
+import sqlite3
+import threading
+from typing import Iterable, List, Optional
+from loguru import logger
+from core.config import Config
+
+KINDS = ("audit", "battle", "compete")
+
+
+class Job:
+    """One leased unit of work. `payload` is the JSON the job was enqueued with."""
+
+    __slots__ = ("id", "kind", "payload", "attempts", "max_attempts", "created_at")
+
+    def __init__(self, id: int, kind: str, payload: dict, attempts: int, max_attempts: int, created_at: float):
+        self.id = id
+        self.kind = kind
+        self.payload = payload
+        self.attempts = attempts
+        self.max_attempts = max_attempts
+        self.created_at = created_at
+
+
+class JobQueue:
+    """Durable multi-process job queue on one SQLite file (data/jobs.sqlite).
+
+    Workers claim a job under a lease and extend it with heartbeats while
+    they run it. A job whose lease runs out (its worker died) becomes
+    claimable again. Failures are retried with exponential backoff until
+    max_attempts, after which the job moves to the dead_letters table.
+    Several processes or hosts can share the file as long as the
+    filesystem honors SQLite's locks.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or Config.QUEUE_PATH
+        self._lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Autocommit mode so claims can take the write lock with BEGIN IMMEDIATE
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " kind TEXT NOT NULL,"
+            " payload TEXT NOT NULL,"
+            " dedupe_key TEXT,"
+            " status TEXT NOT NULL DEFAULT 'queued',"  # queued | leased | done
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " max_attempts INTEGER NOT NULL,"
+            " available_at REAL NOT NULL,"
+            " lease_owner TEXT,"
+            " lease_expires REAL,"
+            " last_error TEXT,"
+            " result TEXT,"
+            " created_at REAL NOT NULL,"
+            " updated_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS jobs_claim ON jobs (status, available_at)"
+        )
+        # The same client can't be queued twice while a copy is still pending
+        self._conn.execute(
+            "CREATE UNIQUE INDEX IF NOT EXISTS jobs_pending_key ON jobs (dedupe_key)"
+            " WHERE status IN ('queued', 'leased')"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS dead_letters ("
+            " job_id INTEGER PRIMARY KEY,"
+            " kind TEXT NOT NULL,"
+            " payload TEXT NOT NULL,"
+            " dedupe_key TEXT,"
+            " attempts INTEGER NOT NULL,"
+            " error TEXT,"
+            " failed_at REAL NOT NULL)"
+        )
+
+    # --- producers ---
+    def enqueue(self, kind: str, payload: dict, dedupe_key: str = None, max_attempts: int = None) -> Optional[int]:
+        """Adds a job; returns its id, or None if an identical job is already pending."""
+        if kind not in KINDS:
+            raise ValueError(f"Unknown job kind: {kind}")
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO jobs (kind, payload, dedupe_key, max_attempts, available_at, created_at, updated_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (kind, json.dumps(payload, ensure_ascii=False), dedupe_key,
+                 max_attempts or Config.QUEUE_MAX_ATTEMPTS, now, now, now)
+            )
+        return cursor.lastrowid if cursor.rowcount else None
+
+    def enqueue_many(self, kind: str, payloads: Iterable[dict], key_fn=None) -> int:
+        """Bulk enqueue in one transaction per chunk; returns how many were new."""
+        added, now = 0, time.time()
+        rows = []
+
+        def flush():
+            nonlocal added
+            with self._lock:
+                self._conn.execute("BEGIN IMMEDIATE")
+                try:
+                    for row in rows:
+                        added += self._conn.execute(
+                            "INSERT OR IGNORE INTO jobs (kind, payload, dedupe_key, max_attempts, available_at,"
+                            " created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)", row
+                        ).rowcount
+                    self._conn.execute("COMMIT")
+                except BaseException:
+                    self._conn.execute("ROLLBACK")
+                    raise
+            rows.clear()
+
+        for payload in payloads:
+            rows.append((kind, json.dumps(payload, ensure_ascii=False), key_fn(payload) if key_fn else None,
+                         Config.QUEUE_MAX_ATTEMPTS, now, now, now))
+            if len(rows) >= 500:
+                flush()
+        if rows:
+            flush()
+        return added
+
+    # --- workers ---
+    def claim(self, worker_id: str, kinds: List[str] = None, lease_seconds: float = None) -> Optional[Job]:
+        """Leases the oldest runnable job (queued, or leased by a worker whose lease expired)."""
+        lease_seconds = lease_seconds or Config.QUEUE_LEASE_SECONDS
+        kinds = list(kinds or KINDS)
+        marks = ",".join("?" * len(kinds))
+        with self._lock:
+            now = time.time()
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._reap_expired(now)
+                row = self._conn.execute(
+                    f"SELECT id, kind, payload, attempts, max_attempts, created_at FROM jobs"
+                    f" WHERE kind IN ({marks}) AND ("
+                    f"  (status = 'queued' AND available_at <= ?) OR (status = 'leased' AND lease_expires < ?))"
+                    f" ORDER BY available_at, id LIMIT 1",
+                    (*kinds, now, now)
+                ).fetchone()
+                if row is None:
+                    self._conn.execute("COMMIT")
+                    return None
+                self._conn.execute(
+                    "UPDATE jobs SET status = 'leased', lease_owner = ?, lease_expires = ?,"
+                    " attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                    (worker_id, now + lease_seconds, now, row[0])
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return Job(row[0], row[1], json.loads(row[2]), row[3] + 1, row[4], row[5])
+
+    def _reap_expired(self, now: float):
+        """Dead-letters jobs whose worker died on their final attempt."""
+        expired = self._conn.execute(
+            "SELECT id FROM jobs WHERE status = 'leased' AND lease_expires < ? AND attempts >= max_attempts", (now,)
+        ).fetchall()
+        for (job_id,) in expired:
+            self._bury(job_id, "lease expired on final attempt", now)
+
+    def _bury(self, job_id: int, error: str, now: float):
+        self._conn.execute(
+            "INSERT OR REPLACE INTO dead_letters (job_id, kind, payload, dedupe_key, attempts, error, failed_at)"
+            " SELECT id, kind, payload, dedupe_key, attempts, ?, ? FROM jobs WHERE id = ?",
+            (error, now, job_id)
+        )
+        self._conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+        logger.error(f"☠️ Job {job_id} dead-lettered: {error[:80]}")
+
+    def heartbeat(self, job: Job, worker_id: str, lease_seconds: float = None) -> bool:
+        """Extends the lease; False means another worker has taken the job over."""
+        lease_seconds = lease_seconds or Config.QUEUE_LEASE_SECONDS
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET lease_expires = ?, updated_at = ?"
+                " WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+                (now + lease_seconds, now, job.id, worker_id)
+            )
+        return cursor.rowcount == 1
+
+    def complete(self, job: Job, worker_id: str, result: dict = None) -> bool:
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = 'done', result = ?, lease_owner = NULL, lease_expires = NULL,"
+                " last_error = NULL, updated_at = ? WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+                (json.dumps(result, ensure_ascii=False, default=str), now, job.id, worker_id)
+            )
+        return cursor.rowcount == 1
+
+    def fail(self, job: Job, worker_id: str, error: str) -> str:
+        """Schedules a retry with backoff, or dead-letters the job. Returns 'retry', 'dead' or 'lost'."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT attempts, max_attempts FROM jobs WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+                    (job.id, worker_id)
+                ).fetchone()
+                if row is None:
+                    outcome = "lost"
+                elif row[0] >= row[1]:
+                    self._bury(job.id, error, now)
+                    outcome = "dead"
+                else:
+                    delay = min(Config.QUEUE_RETRY_CAP, Config.QUEUE_RETRY_BACKOFF * 2 ** (row[0] - 1))
+                    self._conn.execute(
+                        "UPDATE jobs SET status = 'queued', available_at = ?, lease_owner = NULL,"
+                        " lease_expires = NULL, last_error = ?, updated_at = ? WHERE id = ?",
+                        (now + delay, error[:500], now, job.id)
+                    )
+                    outcome = "retry"
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return outcome
+
+    def release(self, job: Job, worker_id: str):
+        """Hands a job back untouched (worker shutting down); the attempt is not counted."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = 'queued', attempts = attempts - 1, lease_owner = NULL,"
+                " lease_expires = NULL, updated_at = ? WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+                (time.time(), job.id, worker_id)
+            )
+
+    # --- operations ---
+    def requeue_dead(self, job_ids: List[int] = None) -> int:
+        """Moves dead letters back into the queue with a fresh attempt budget."""
+        now = time.time()
+        where, params = ("WHERE job_id IN (%s)" % ",".join("?" * len(job_ids)), list(job_ids)) if job_ids else ("", [])
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    f"SELECT job_id, kind, payload, dedupe_key FROM dead_letters {where}", params
+                ).fetchall()
+                for job_id, kind, payload, dedupe_key in rows:
+                    self._conn.execute(
+                        "INSERT OR IGNORE INTO jobs (kind, payload, dedupe_key, max_attempts, available_at,"
+                        " created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (kind, payload, dedupe_key, Config.QUEUE_MAX_ATTEMPTS, now, now, now)
+                    )
+                    self._conn.execute("DELETE FROM dead_letters WHERE job_id = ?", (job_id,))
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return len(rows)
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = dict(self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+            counts["dead"] = self._conn.execute("SELECT COUNT(*) FROM dead_letters").fetchone()[0]
+            counts["expired_leases"] = self._conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = 'leased' AND lease_expires < ?", (time.time(),)
+            ).fetchone()[0]
+        return {status: counts.get(status, 0) for status in ("queued", "leased", "done", "dead", "expired_leases")}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class Heartbeat:
+    """Background lease renewal while a worker runs one job."""
+
+    def __init__(self, queue: JobQueue, job: Job, worker_id: str, interval: float = None):
+        self.queue = queue
+        self.job = job
+        self.worker_id = worker_id
+        self.interval = interval or Config.QUEUE_LEASE_SECONDS / 3
+        self.lost = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"heartbeat-{job.id}", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                alive = self.queue.heartbeat(self.job, self.worker_id)
+            except Exception as e:
+                # e.g. "database is locked": the lease is still ours, try again next tick
+                logger.warning(f"Heartbeat for job {self.job.id} failed ({e}), retrying")
+                continue
+            if not alive:
+                self.lost = True
+                logger.warning(f"💔 Lost lease on job {self.job.id}; another worker may re-run it")
+                return
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
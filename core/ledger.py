@@ -0,0 +1,88 @@
+import json
+import time
+import sqlite3
+import threading
+from typing import Callable, Iterator, Optional
+from core.config import Config
+
+
+class AuditLedger:
+    """Last successful audit per brand, keyed by an input fingerprint.
+
+    The fingerprint covers everything that shapes an audit (brand, niche,
+    prompt template, model, endpoint). A brand is re-audited only when its
+    fingerprint changed or its last success is older than the staleness
+    window; otherwise the stored report is reused.
+    """
+
+    def __init__(self, path=None, max_age_hours: float = None):
+        self.path = path or Config.DATA_DIR / "audit_ledger.sqlite"
+        self.max_age = (max_age_hours if max_age_hours is not None else Config.STALENESS_HOURS) * 3600
+        self._lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS audits ("
+            " key TEXT PRIMARY KEY,"
+            " fingerprint TEXT NOT NULL,"
+            " audited_at REAL NOT NULL,"
+            " report TEXT NOT NULL,"
+            " pdf_path TEXT)"
+        )
+        self._conn.commit()
+
+    def lookup(self, key: str, fingerprint: str) -> Optional[dict]:
+        """Returns the stored entry if it is still valid for this fingerprint."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT fingerprint, audited_at, report, pdf_path FROM audits WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None or row[0] != fingerprint or time.time() - row[1] > self.max_age:
+            return None
+        return {"audited_at": row[1], "report": json.loads(row[2]), "pdf_path": row[3]}
+
+    def record(self, key: str, fingerprint: str, report: dict, pdf_path: str = None):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO audits (key, fingerprint, audited_at, report, pdf_path) VALUES (?, ?, ?, ?, ?)",
+                (key, fingerprint, time.time(), json.dumps(report, ensure_ascii=False), pdf_path)
+            )
+            self._conn.commit()
+
+    def set_pdf_path(self, key: str, pdf_path: str):
+        """Points an entry at a re-rendered PDF without touching its audit time."""
+        with self._lock:
+            self._conn.execute("UPDATE audits SET pdf_path = ? WHERE key = ?", (pdf_path, key))
+            self._conn.commit()
+
+    def iter_reports(self, niche: str = None, batch: int = 500) -> Iterator[dict]:
+        """Streams the latest stored report of every brand (optionally one niche), in key order."""
+        last = ""
+        while True:
+            # Keyset pages: constant memory, and the lock is never held while the caller works
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT key, report FROM audits WHERE key > ? ORDER BY key LIMIT ?", (last, batch)
+                ).fetchall()
+            for key, report in rows:
+                if niche is None or key.endswith(f"|{niche}"):
+                    yield json.loads(report)
+            if len(rows) < batch:
+                return
+            last = rows[-1][0]
+
+    def stale(self, clients: Iterator[dict], key_fn: Callable[[dict], str],
+              fingerprint_fn: Callable[[dict], str], on_fresh: Callable[[dict, dict], None]) -> Iterator[dict]:
+        """Yields clients that need a new audit; hands fresh ones to `on_fresh(client, entry)`."""
+        for client in clients:
+            entry = self.lookup(key_fn(client), fingerprint_fn(client))
+            if entry is None:
+                yield client
+            else:
+                on_fresh(client, entry)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,240 @@
+import time
+import random
+import asyncio
+from types import SimpleNamespace
+from loguru import logger
+from openai import RateLimitError, APIConnectionError, APITimeoutError, InternalServerError, Timeout
+from core.config import Config
+from core.scheduler import PRIORITY_BULK, get_scheduler, estimate_tokens
+from core.telemetry import telemetry
+from core.parsing import StreamingJSON
+
+JSON_MODE = {"type": "json_object"}
+
+RETRYABLE_ERRORS = (RateLimitError, APIConnectionError, InternalServerError)
+
+
+class StreamAborted(Exception):
+    """A streamed generation we gave up on: no first token, too slow, or off-schema."""
+
+    def __init__(self, reason: str, detail: str):
+        super().__init__(f"{reason}: {detail}")
+        self.reason = reason
+
+
+def retry_delay(error, attempt: int) -> float:
+    """Honors Retry-After from the provider, else jittered exponential backoff."""
+    if isinstance(error, StreamAborted):
+        return 0.0  # the provider is fine, this one generation was not
+    response = getattr(error, "response", None)
+    header = response.headers.get("retry-after") if response is not None else None
+    if header:
+        try:
+            return max(0.0, float(header))
+        except ValueError:
+            pass
+    return min(30.0, 2 ** attempt) * (0.5 + random.random() / 2)
+
+
+def chat_json(client, messages: list, priority: int = PRIORITY_BULK, model: str = None,
+              component: str = "GEOAuditor", on_admit=None):
+    """One JSON-mode Groq completion admitted by the shared scheduler.
+
+    The OpenAI client is expected to run with max_retries=0 so every 429 is
+    seen here and fed back into the provider's adaptive limit. `on_admit`
+    is called each time the scheduler lets an attempt through.
+    """
+    scheduler = get_scheduler()
+    estimate = estimate_tokens(messages)
+    for attempt in range(Config.LLM_MAX_RETRIES + 1):
+        try:
+            with scheduler.slot("groq", priority, estimate) as ticket:
+                if on_admit:
+                    on_admit()
+                with telemetry.span("llm_call", component):
+                    response = client.chat.completions.create(
+                        model=model or Config.GROQ_MODEL,
+                        messages=messages,
+                        response_format=JSON_MODE
+                    )
+                ticket.tokens_used = getattr(response.usage, "total_tokens", None)
+                telemetry.record_usage(component, model or Config.GROQ_MODEL, response.usage)
+                return response
+        except RETRYABLE_ERRORS as e:
+            if attempt == Config.LLM_MAX_RETRIES:
+                raise
+            time.sleep(retry_delay(e, attempt))
+
+
+async def achat_json(client, messages: list, priority: int = PRIORITY_BULK, model: str = None,
+                     component: str = "GEOAuditor", on_admit=None):
+    """Async counterpart of chat_json for AsyncOpenAI clients."""
+    scheduler = get_scheduler()
+    estimate = estimate_tokens(messages)
+    for attempt in range(Config.LLM_MAX_RETRIES + 1):
+        try:
+            async with scheduler.aslot("groq", priority, estimate) as ticket:
+                if on_admit:
+                    on_admit()
+                with telemetry.span("llm_call", component):
+                    response = await client.chat.completions.create(
+                        model=model or Config.GROQ_MODEL,
+                        messages=messages,
+                        response_format=JSON_MODE
+                    )
+                ticket.tokens_used = getattr(response.usage, "total_tokens", None)
+                telemetry.record_usage(component, model or Config.GROQ_MODEL, response.usage)
+                return response
+        except RETRYABLE_ERRORS as e:
+            if attempt == Config.LLM_MAX_RETRIES:
+                raise
+            await asyncio.sleep(retry_delay(e, attempt))
+
+
+# --- streaming ----------------------------------------------------------------
+
+def _stream_kwargs(messages: list, model: str) -> dict:
+    # Groq rejects response_format together with stream=True, so JSON is
+    # enforced by the prompt and StreamingJSON instead of JSON mode.
+    return dict(
+        model=model or Config.GROQ_MODEL,
+        messages=messages,
+        stream=True,
+        stream_options={"include_usage": True},
+        # read= bounds the wait for the first chunk and every gap after it
+        timeout=Timeout(Config.STREAM_TOTAL_TIMEOUT, read=Config.STREAM_FIRST_TOKEN_TIMEOUT),
+    )
+
+
+class _StreamState:
+    """Deadline bookkeeping and incremental parsing shared by the sync and async readers."""
+
+    def __init__(self, component: str, expected_keys):
+        self.component = component
+        self.parser = StreamingJSON(expected_keys)
+        self.usage = None
+        self.started = time.perf_counter()
+        self.first_token = None
+
+    def on_chunk(self, chunk):
+        if getattr(chunk, "usage", None):
+            self.usage = chunk.usage
+        if not chunk.choices:
+            return
+        delta = chunk.choices[0].delta.content
+        if not delta:
+            return
+        now = time.perf_counter()
+        if self.first_token is None:
+            self.first_token = now
+            telemetry.observe("ttft", self.component, now - self.started)
+        self.parser.feed(delta)
+        if self.parser.off_schema:
+            raise StreamAborted("off_schema", self.parser.off_schema)
+        if now - self.started > Config.STREAM_TOTAL_TIMEOUT:
+            raise StreamAborted("deadline", f"generation exceeded {Config.STREAM_TOTAL_TIMEOUT:.0f}s")
+
+    def timed_out(self) -> StreamAborted:
+        if self.first_token is None:
+            return StreamAborted("ttft", f"no first token within {Config.STREAM_FIRST_TOKEN_TIMEOUT:.0f}s")
+        return StreamAborted("stalled", f"no tokens for {Config.STREAM_FIRST_TOKEN_TIMEOUT:.0f}s")
+
+    def response(self):
+        """Non-streaming-shaped result so callers treat both paths alike."""
+        message = SimpleNamespace(content=self.parser.text)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=self.usage)
+
+
+def _log_abort(component: str, error: StreamAborted, attempt: int):
+    logger.warning(f"✂️ {component} stream cancelled ({error}), retry {attempt + 1}/{Config.LLM_MAX_RETRIES}")
+
+
+def stream_json(client, messages: list, priority: int = PRIORITY_BULK, model: str = None,
+                component: str = "GEOAuditor", expected_keys=None, on_admit=None):
+    """chat_json over a token stream with first-token/total deadlines.
+
+    The JSON object is scanned as it arrives; a generation that starts with
+    prose, gives a key in `expected_keys` the wrong kind of value, misses
+    its first-token deadline or stalls is cancelled and retried immediately
+    instead of running to completion.
+    """
+    scheduler = get_scheduler()
+    estimate = estimate_tokens(messages)
+    for attempt in range(Config.LLM_MAX_RETRIES + 1):
+        try:
+            with scheduler.slot("groq", priority, estimate) as ticket:
+                if on_admit:
+                    on_admit()
+                with telemetry.span("llm_call", component):
+                    state = _StreamState(component, expected_keys)
+                    try:
+                        stream = client.chat.completions.create(**_stream_kwargs(messages, model))
+                        with stream:
+                            for chunk in stream:
+                                state.on_chunk(chunk)
+                    except APITimeoutError:
+                        # No first token or a stall: the provider is overloaded, not this answer
+                        ticket.congested = True
+                        raise state.timed_out() from None
+                    except StreamAborted:
+                        ticket.cancelled = True
+                        raise
+                ticket.tokens_used = getattr(state.usage, "total_tokens", None)
+                telemetry.record_usage(component, model or Config.GROQ_MODEL, state.usage)
+                return state.response()
+        except (StreamAborted,) + RETRYABLE_ERRORS as e:
+            if attempt == Config.LLM_MAX_RETRIES:
+                raise
+            if isinstance(e, StreamAborted):
+                _log_abort(component, e, attempt)
+            time.sleep(retry_delay(e, attempt))
+
+
+async def astream_json(client, messages: list, priority: int = PRIORITY_BULK, model: str = None,
+                       component: str = "GEOAuditor", expected_keys=None, on_admit=None):
+    """Async counterpart of stream_json for AsyncOpenAI clients."""
+    scheduler = get_scheduler()
+    estimate = estimate_tokens(messages)
+    for attempt in range(Config.LLM_MAX_RETRIES + 1):
+        try:
+            async with scheduler.aslot("groq", priority, estimate) as ticket:
+                if on_admit:
+                    on_admit()
+                with telemetry.span("llm_call", component):
+                    state = _StreamState(component, expected_keys)
+                    try:
+                        stream = await client.chat.completions.create(**_stream_kwargs(messages, model))
+                        async with stream:
+                            async for chunk in stream:
+                                state.on_chunk(chunk)
+                    except APITimeoutError:
+                        # No first token or a stall: the provider is overloaded, not this answer
+                        ticket.congested = True
+                        raise state.timed_out() from None
+                    except StreamAborted:
+                        ticket.cancelled = True
+                        raise
+                ticket.tokens_used = getattr(state.usage, "total_tokens", None)
+                telemetry.record_usage(component, model or Config.GROQ_MODEL, state.usage)
+                return state.response()
+        except (StreamAborted,) + RETRYABLE_ERRORS as e:
+            if attempt == Config.LLM_MAX_RETRIES:
+                raise
+            if isinstance(e, StreamAborted):
+                _log_abort(component, e, attempt)
+            await asyncio.sleep(retry_delay(e, attempt))
+
+
+def complete_json(client, messages: list, priority: int = PRIORITY_BULK, model: str = None,
+                  component: str = "GEOAuditor", expected_keys=None, on_admit=None):
+    """Streams when Config.STREAM_RESPONSES is on, else a plain JSON-mode call."""
+    if Config.STREAM_RESPONSES:
+        return stream_json(client, messages, priority, model, component, expected_keys, on_admit)
+    return chat_json(client, messages, priority, model, component, on_admit)
+
+
+async def acomplete_json(client, messages: list, priority: int = PRIORITY_BULK, model: str = None,
+                         component: str = "GEOAuditor", expected_keys=None, on_admit=None):
+    if Config.STREAM_RESPONSES:
+        return await astream_json(client, messages, priority, model, component, expected_keys, on_admit)
+    return await achat_json(client, messages, priority, model, component, on_admit)
@@ -0,0 +1,372 @@
+import re
+import json
+import typing
+import threading
+from collections import Counter, defaultdict
+from functools import lru_cache
+from pydantic import BaseModel, TypeAdapter, ValidationError
+from loguru import logger
+
+try:  # optional fast decoder
+    import orjson
+
+    def _loads(text: str):
+        return orjson.loads(text)
+
+    _DECODE_ERRORS = (orjson.JSONDecodeError, ValueError)
+except ImportError:  # stdlib fallback
+    orjson = None
+
+    def _loads(text: str):
+        return json.loads(text)
+
+    _DECODE_ERRORS = (json.JSONDecodeError, ValueError)
+
+_FENCE = re.compile(r"^\s*```[a-zA-Z0-9_-]*\s*\n?|\n?\s*```\s*$")
+_MAX_TRUNCATION_CUTS = 25
+
+_stats = defaultdict(Counter)
+_stats_lock = threading.Lock()
+
+
+class ModelOutputError(ValueError):
+    """Raised when model output cannot be parsed or repaired into the schema."""
+
+
+def _count(name: str, outcome: str):
+    with _stats_lock:
+        _stats[name][outcome] += 1
+
+
+def parse_stats() -> dict:
+    """Per-schema counters: clean, repaired (round trip saved), failed, model_retry."""
+    with _stats_lock:
+        return {name: dict(counter) for name, counter in _stats.items()}
+
+
+def record_model_retry(name: str):
+    _count(name, "model_retry")
+
+
+@lru_cache(maxsize=None)
+def type_adapter(schema) -> TypeAdapter:
+    """One compiled validator per schema, reused for every response."""
+    return TypeAdapter(schema)
+
+
+# --- local repair -----------------------------------------------------------
+
+def _strip_fences(text: str) -> str:
+    """Removes markdown code fences and any prose around the outermost object."""
+    text = _FENCE.sub("", text.strip())
+    starts = [i for i in (text.find("{"), text.find("[")) if i != -1]
+    if not starts:
+        return text
+    text = text[min(starts):]
+    end = max(text.rfind("}"), text.rfind("]"))
+    # Keep a truncated tail intact: only trim when something follows the last closer
+    if end != -1 and text[end + 1:].strip() and not _unbalanced(text[:end + 1]):
+        text = text[:end + 1]
+    return text
+
+
+def _analyze(text: str):
+    """One string-aware pass: (open bracket stack, inside_string, structural comma offsets)."""
+    stack, commas = [], []
+    in_string = escaped = False
+    for i, ch in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+            continue
+        if ch == '"':
+            in_string = True
+        elif ch in "{[":
+            stack.append("}" if ch == "{" else "]")
+        elif ch in "}]":
+            if stack:
+                stack.pop()
+        elif ch == ",":
+            commas.append(i)
+    return stack, in_string, commas
+
+
+def _unbalanced(text: str) -> bool:
+    stack, in_string, _ = _analyze(text)
+    return bool(stack) or in_string
+
+
+def _strip_trailing_commas(text: str) -> str:
+    _, _, commas = _analyze(text)
+    dangling = {i for i in commas if text[i + 1:].lstrip()[:1] in ("}", "]")}
+    if not dangling:
+        return text
+    return "".join(ch for i, ch in enumerate(text) if i not in dangling)
+
+
+def _close_truncated(text: str):
+    """Recovers an object cut off mid-generation by trimming to the last complete member."""
+    _, _, commas = _analyze(text)
+    candidates = [text] + [text[:i] for i in reversed(commas[-_MAX_TRUNCATION_CUTS:])]
+
+    for prefix in candidates:
+        stack, in_string, _ = _analyze(prefix)
+        if in_string:
+            prefix += '"'
+        prefix = prefix.rstrip(",: \n\t")
+        try:
+            return _loads(_strip_trailing_commas(prefix + "".join(reversed(stack))))
+        except _DECODE_ERRORS:
+            continue
+    raise ModelOutputError("Output is truncated beyond recovery")
+
+
+def _normalize_key(key) -> str:
+    return re.sub(r"[\s\-]+", "_", str(key).strip()).lower()
+
+
+def _normalize_aliases(value):
+    """Lower-cases keys and maps 'Visibility Score' / 'visibility-score' to snake_case."""
+    if isinstance(value, dict):
+        return {_normalize_key(k): _normalize_aliases(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_normalize_aliases(v) for v in value]
+    return value
+
+
+def repair_json(raw: str):
+    """Best-effort local recovery of model JSON. Raises ModelOutputError when hopeless."""
+    if raw is None:
+        raise ModelOutputError("Empty model output")
+    text = _strip_fences(raw)
+    try:
+        return _loads(text)
+    except _DECODE_ERRORS:
+        pass
+    try:
+        return _loads(_strip_trailing_commas(text))
+    except _DECODE_ERRORS:
+        pass
+    return _close_truncated(text)
+
+
+# --- streaming ----------------------------------------------------------------
+
+_PREAMBLE = re.compile(r"\s*(`{1,3}[a-zA-Z]*\s*)?")
+
+
+def _json_kind(annotation):
+    """'object', 'array' or 'scalar' for a field annotation; None if it could be several."""
+    origin = typing.get_origin(annotation)
+    if origin is typing.Union:
+        kinds = {_json_kind(arg) for arg in typing.get_args(annotation) if arg is not type(None)}
+        return kinds.pop() if len(kinds) == 1 else None
+    annotation = origin or annotation
+    if annotation in (list, tuple, set, frozenset):
+        return "array"
+    if annotation is dict or (isinstance(annotation, type) and issubclass(annotation, BaseModel)):
+        return "object"
+    if annotation in (str, int, float, bool):
+        return "scalar"  # lax validation accepts "85" for a float, so scalars aren't told apart
+    return None
+
+
+def schema_keys(schema) -> dict:
+    """Every top-level key (field names and validation aliases) a schema accepts, normalized,
+    mapped to the JSON kind of its value."""
+    keys = {}
+    for name, info in getattr(schema, "model_fields", {}).items():
+        kind = _json_kind(info.annotation)
+        keys[name] = kind
+        alias = info.validation_alias
+        for choice in getattr(alias, "choices", None) or ([alias] if isinstance(alias, str) else []):
+            if isinstance(choice, str):
+                keys[choice] = kind
+    return {_normalize_key(k): kind for k, kind in keys.items()}
+
+
+def _value_kind(ch: str):
+    if ch == "{":
+        return "object"
+    if ch == "[":
+        return "array"
+    return None if ch == "n" else "scalar"  # null is left to validation
+
+
+class StreamingJSON:
+    """String-aware incremental scan of a JSON object while it is being generated.
+
+    Feed it deltas as they arrive. `complete` flips once the top-level value
+    closes; `off_schema` holds a reason as soon as the output clearly cannot
+    be what we asked for: prose instead of JSON, a top-level array when an
+    object with `expected_keys` was asked for, or a known key whose value
+    has the wrong shape. Pass a {key: kind} mapping (see schema_keys) to
+    check value shapes. Unknown keys are ignored; validation drops them.
+    """
+
+    def __init__(self, expected_keys=None):
+        self.expected = None
+        if expected_keys:
+            kinds = expected_keys if isinstance(expected_keys, dict) else dict.fromkeys(expected_keys)
+            self.expected = {_normalize_key(k): kind for k, kind in kinds.items()}
+        self.parts = []
+        self.started = self.complete = False
+        self.off_schema = None
+
+        self._preamble = ""
+        self._stack = []
+        self._in_string = self._escaped = False
+        self._expect_key = False
+        self._key = None       # chars of the top-level key being read
+        self._pending = None   # finished top-level key waiting for its value
+
+    @property
+    def text(self) -> str:
+        return "".join(self.parts)
+
+    def feed(self, delta: str):
+        if self.complete or self.off_schema:
+            return
+        self.parts.append(delta)
+        for ch in delta:
+            self._step(ch)
+            if self.complete or self.off_schema:
+                return
+
+    def _step(self, ch: str):
+        if not self.started:
+            if ch == "[" and self.expected is not None:
+                self.off_schema = "output is a JSON array, not an object"
+                return
+            if ch in "{[":
+                self.started = True
+                self._stack.append("}" if ch == "{" else "]")
+                self._expect_key = ch == "{"
+                return
+            self._preamble += ch
+            if not _PREAMBLE.fullmatch(self._preamble):
+                self.off_schema = f"output starts with {self._preamble.strip()[:30]!r}, not JSON"
+            return
+
+        top_level = len(self._stack) == 1 and self._stack[0] == "}"
+        if self._in_string:
+            if self._escaped:
+                self._escaped = False
+            elif ch == "\\":
+                self._escaped = True
+            elif ch == '"':
+                self._in_string = False
+                if self._key is not None:
+                    self._pending, self._key = "".join(self._key), None
+                return
+            if self._key is not None:
+                self._key.append(ch)
+            return
+        if ch.isspace() or ch == ":":
+            return
+
+        if top_level and self._pending is not None:
+            self._check_value(self._pending, ch)
+            self._pending = None
+        if ch == '"':
+            self._in_string = True
+            if top_level and self._expect_key:
+                self._key, self._expect_key = [], False
+        elif ch in "{[":
+            self._stack.append("}" if ch == "{" else "]")
+        elif ch in "}]":
+            if self._stack:
+                self._stack.pop()
+            self.complete = not self._stack
+        elif ch == "," and top_level:
+            self._expect_key = True
+
+    def _check_value(self, key: str, ch: str):
+        expected = self.expected.get(_normalize_key(key)) if self.expected else None
+        actual = _value_kind(ch)
+        if expected and actual and actual != expected:
+            self.off_schema = f"top-level key {key!r} holds {actual}, expected {expected}"
+
+
+# --- public entry points ----------------------------------------------------
+
+def parse_json(raw: str, name: str = "json"):
+    """Decodes a JSON payload, repairing it locally if needed."""
+    if raw is None:
+        _count(name, "failed")
+        raise ModelOutputError("Empty model output")
+    try:
+        value = _loads(raw)
+        _count(name, "clean")
+        return value
+    except _DECODE_ERRORS:
+        pass
+    try:
+        value = repair_json(raw)
+    except ModelOutputError:
+        _count(name, "failed")
+        raise
+    _count(name, "repaired")
+    logger.debug(f"🩹 Repaired {name} output locally")
+    return value
+
+
+def parse_model_output(raw: str, schema):
+    """Validates model output against a pydantic schema, repairing it locally first.
+
+    Fast path is pydantic-core's JSON validator; only on failure do we decode,
+    repair, normalize aliases and unwrap a single wrapper key before giving up.
+    """
+    name = getattr(schema, "__name__", str(schema))
+    adapter = type_adapter(schema)
+    try:
+        result = adapter.validate_json(raw)
+        _count(name, "clean")
+        return result
+    except (ValidationError, TypeError):
+        pass
+
+    try:
+        data = repair_json(raw)
+    except ModelOutputError:
+        _count(name, "failed")
+        raise
+
+    return _validate_candidates(data, schema, name)
+
+
+def validate_data(data, schema):
+    """Validates already-decoded data, falling back to alias normalization."""
+    name = getattr(schema, "__name__", str(schema))
+    try:
+        result = type_adapter(schema).validate_python(data)
+        _count(name, "clean")
+        return result
+    except ValidationError:
+        return _validate_candidates(data, schema, name)
+
+
+def _validate_candidates(data, schema, name):
+    adapter = type_adapter(schema)
+    attempts = [data, _normalize_aliases(data)]
+    # {"audit": {...}} / {"report": {...}} wrappers
+    if isinstance(data, dict) and len(data) == 1:
+        inner = next(iter(data.values()))
+        attempts += [inner, _normalize_aliases(inner)]
+
+    last_error = None
+    for candidate in attempts:
+        try:
+            result = adapter.validate_python(candidate)
+            _count(name, "repaired")
+            logger.debug(f"🩹 Repaired {name} output locally")
+            return result
+        except ValidationError as e:
+            last_error = e
+
+    _count(name, "failed")
+    raise ModelOutputError(f"{name} output failed validation: {str(last_error)[:200]}")
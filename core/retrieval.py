@@ -0,0 +1,217 @@
+import re
+import json
+import hashlib
+from typing import List, Tuple
+import numpy as np
+from loguru import logger
+from core.config import Config
+
+_TOKEN = re.compile(r"[\w$€£%.]+", re.UNICODE)
+_SENTENCE = re.compile(r"(?<=[.!?])\s+|\n+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the this to was were will with "
+    "our we you your their they he she his her them which who what when where how than then there these those".split()
+)
+
+# BM25 parameters
+K1 = 1.5
+B = 0.75
+
+
+def tokenize(text: str) -> List[str]:
+    tokens = []
+    for raw in _TOKEN.findall(text.lower()):
+        token = raw.strip(".")
+        if token and token not in _STOPWORDS:
+            tokens.append(token)
+    return tokens
+
+
+def chunk_text(text: str, max_words: int = None, overlap: int = None) -> List[str]:
+    """Paragraph-aware chunks of up to max_words words with a small overlap."""
+    max_words = max_words or Config.RETRIEVAL_CHUNK_WORDS
+    overlap = overlap if overlap is not None else Config.RETRIEVAL_CHUNK_OVERLAP
+    chunks, current, fresh = [], [], 0
+
+    def emit(words):
+        chunks.append(" ".join(words))
+        return (words[-overlap:] if overlap else []), 0
+
+    for paragraph in re.split(r"\n\s*\n", text):
+        words = paragraph.split()
+        if not words:
+            continue
+        if fresh and len(current) + len(words) > max_words:
+            current, fresh = emit(current)
+        current.extend(words)
+        fresh += len(words)
+        # Paragraphs longer than a chunk are split in place
+        while len(current) > max_words:
+            head = current[:max_words]
+            rest = current[max_words:]
+            _, fresh = emit(head)
+            current = (head[-overlap:] if overlap else []) + rest
+            fresh = len(rest)
+    if fresh:
+        emit(current)
+    return chunks
+
+
+def _digest(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+class GroundTruthIndex:
+    """Per-brand BM25 index over a client's ground-truth corpus.
+
+    Chunks are content-addressed, so when the docs change only new chunks
+    are tokenized; the postings are rebuilt with NumPy and persisted under
+    data/indexes/<brand>/. Pass persist=False for a throwaway in-memory index.
+    """
+
+    def __init__(self, brand: str = None, root=None, persist: bool = True):
+        self.brand = brand
+        self.persist = persist and brand is not None
+        slug = re.sub(r"[^\w-]+", "_", brand or "adhoc").strip("_") or "brand"
+        self.dir = (root or Config.DATA_DIR / "indexes") / slug
+
+        self.corpus_hash = None
+        self.chunks = []        # [{"id", "text", "terms": {term: tf}}]
+        self.vocab = {}         # term -> row in offsets
+        self.offsets = np.zeros(1, dtype=np.int64)
+        self.post_chunks = np.zeros(0, dtype=np.int32)
+        self.post_tf = np.zeros(0, dtype=np.float32)
+        self.doc_len = np.zeros(0, dtype=np.float32)
+        self.idf = np.zeros(0, dtype=np.float32)
+
+        if self.persist:
+            self._load()
+
+    # --- persistence ---
+    def _load(self):
+        meta_path = self.dir / "chunks.json"
+        arrays_path = self.dir / "postings.npz"
+        if not meta_path.exists() or not arrays_path.exists():
+            return
+        meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        with np.load(arrays_path) as arrays:
+            self.offsets = arrays["offsets"]
+            self.post_chunks = arrays["post_chunks"]
+            self.post_tf = arrays["post_tf"]
+            self.doc_len = arrays["doc_len"]
+            self.idf = arrays["idf"]
+        self.corpus_hash = meta["corpus_hash"]
+        self.chunks = meta["chunks"]
+        self.vocab = {term: i for i, term in enumerate(meta["vocab"])}
+
+    def _save(self):
+        self.dir.mkdir(parents=True, exist_ok=True)
+        vocab = sorted(self.vocab, key=self.vocab.get)
+        meta = {"brand": self.brand, "corpus_hash": self.corpus_hash, "vocab": vocab, "chunks": self.chunks}
+        (self.dir / "chunks.json").write_text(json.dumps(meta, ensure_ascii=False), encoding="utf-8")
+        np.savez(self.dir / "postings.npz", offsets=self.offsets, post_chunks=self.post_chunks,
+                 post_tf=self.post_tf, doc_len=self.doc_len, idf=self.idf)
+
+    # --- indexing ---
+    def sync(self, docs: str) -> bool:
+        """Brings the index in line with `docs`. Returns True if anything changed."""
+        corpus_hash = _digest(docs)
+        if corpus_hash == self.corpus_hash:
+            return False
+
+        known = {chunk["id"]: chunk for chunk in self.chunks}
+        chunks, reused = [], 0
+        for text in chunk_text(docs):
+            chunk_id = _digest(text)
+            if chunk_id in known:
+                chunks.append(known[chunk_id])
+                reused += 1
+                continue
+            terms = {}
+            for token in tokenize(text):
+                terms[token] = terms.get(token, 0) + 1
+            chunks.append({"id": chunk_id, "text": text, "terms": terms})
+
+        self.chunks = chunks
+        self.corpus_hash = corpus_hash
+        self._build_postings()
+        if self.persist:
+            self._save()
+        logger.info(f"📚 Indexed {len(chunks)} ground-truth chunks for {self.brand or 'ad-hoc docs'} "
+                    f"({reused} unchanged)")
+        return True
+
+    def _build_postings(self):
+        postings = {}
+        doc_len = np.zeros(len(self.chunks), dtype=np.float32)
+        for idx, chunk in enumerate(self.chunks):
+            doc_len[idx] = sum(chunk["terms"].values())
+            for term, tf in chunk["terms"].items():
+                postings.setdefault(term, []).append((idx, tf))
+
+        vocab = sorted(postings)
+        self.vocab = {term: i for i, term in enumerate(vocab)}
+        lengths = np.fromiter((len(postings[t]) for t in vocab), dtype=np.int64, count=len(vocab))
+        self.offsets = np.concatenate(([0], np.cumsum(lengths))).astype(np.int64)
+        flat = [p for t in vocab for p in postings[t]]
+        self.post_chunks = np.fromiter((p[0] for p in flat), dtype=np.int32, count=len(flat))
+        self.post_tf = np.fromiter((p[1] for p in flat), dtype=np.float32, count=len(flat))
+        self.doc_len = doc_len
+
+        n = max(len(self.chunks), 1)
+        self.idf = np.log1p((n - lengths + 0.5) / (lengths + 0.5)).astype(np.float32)
+
+    # --- querying ---
+    def search(self, query: str, k: int = None) -> List[Tuple[float, int]]:
+        """Top-k (score, chunk index) for a query, BM25-scored."""
+        k = k or Config.RETRIEVAL_TOP_K
+        if not self.chunks:
+            return []
+        scores = np.zeros(len(self.chunks), dtype=np.float32)
+        avgdl = float(self.doc_len.mean()) or 1.0
+        norm = K1 * (1 - B + B * self.doc_len / avgdl)
+
+        for term in set(tokenize(query)):
+            row = self.vocab.get(term)
+            if row is None:
+                continue
+            lo, hi = self.offsets[row], self.offsets[row + 1]
+            docs, tf = self.post_chunks[lo:hi], self.post_tf[lo:hi]
+            scores[docs] += self.idf[row] * tf * (K1 + 1) / (tf + norm[docs])
+
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(float(scores[i]), int(i)) for i in top if scores[i] > 0]
+
+    def passages_for_claims(self, ai_response: str, k: int = None) -> List[str]:
+        """Top-k passages covering the individual claims in an AI answer.
+
+        Slots the claims leave unfilled go to the opening chunks of the corpus.
+        """
+        k = k or Config.RETRIEVAL_TOP_K
+        claims = [s for s in _SENTENCE.split(ai_response) if tokenize(s)] or [ai_response]
+
+        # Round-robin over per-claim rankings so every claim gets evidence
+        rankings = [self.search(claim, k) for claim in claims]
+        chosen, seen = [], set()
+        for depth in range(k):
+            for ranking in rankings:
+                if depth < len(ranking) and ranking[depth][1] not in seen:
+                    seen.add(ranking[depth][1])
+                    chosen.append(ranking[depth][1])
+                if len(chosen) >= k:
+                    break
+            if len(chosen) >= k:
+                break
+        # A fabricated claim often shares no terms with the corpus at all; the
+        # leading chunks (overview, company facts) give the judge something to
+        # contradict it with instead of an empty ground truth
+        for idx in range(len(self.chunks)):
+            if len(chosen) >= k:
+                break
+            if idx not in seen:
+                seen.add(idx)
+                chosen.append(idx)
+        # Keep document order so passages read naturally
+        return [self.chunks[i]["text"] for i in sorted(chosen)]
@@ -0,0 +1,284 @@
+import time
+import asyncio
+import threading
+from collections import Counter, defaultdict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, List, Optional
+from loguru import logger
+from core.config import Config
+from core.llm import complete_json, acomplete_json
+from core.parsing import record_model_retry
+from core.scheduler import PRIORITY_BULK
+from core.telemetry import telemetry
+
+PROVIDER = "groq"
+
+_stats = defaultdict(Counter)  # model -> calls / served / escalated / hedged / hedge_won
+_stats_lock = threading.Lock()
+_pool = None
+
+
+def cascade() -> List[str]:
+    """Models tried in order, cheapest first; the last one is authoritative."""
+    return Config.MODEL_CASCADE or [Config.GROQ_MODEL]
+
+
+def model_signature() -> str:
+    """Names the cascade in cache keys and audit fingerprints (just the model when there is none)."""
+    return "+".join(cascade())
+
+
+def routing_stats() -> dict:
+    with _stats_lock:
+        return {model: dict(counts) for model, counts in _stats.items()}
+
+
+def _count(model: str, outcome: str):
+    with _stats_lock:
+        _stats[model][outcome] += 1
+
+
+class LatencyWindow:
+    """Rolling latency samples per provider/model; their p95 is the hedging threshold."""
+
+    def __init__(self, size: int = None):
+        self.size = size or Config.HEDGE_WINDOW
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def observe(self, model: str, seconds: float, provider: str = PROVIDER):
+        with self._lock:
+            window = self._samples.get((provider, model))
+            if window is None:
+                window = self._samples[(provider, model)] = deque(maxlen=self.size)
+            window.append(seconds)
+
+    def quantile(self, model: str, q: float, provider: str = PROVIDER) -> Optional[float]:
+        """None until the window holds enough samples to trust."""
+        with self._lock:
+            samples = sorted(self._samples.get((provider, model), ()))
+        if len(samples) < Config.HEDGE_MIN_SAMPLES:
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+    def stats(self) -> dict:
+        return {
+            f"{provider}/{model}": {"p50": self.quantile(model, 0.5, provider),
+                                    "p95": self.quantile(model, 0.95, provider)}
+            for provider, model in list(self._samples)
+        }
+
+
+latency = LatencyWindow()
+
+
+# --- hedging --------------------------------------------------------------------
+
+def _hedge_delay(model: str) -> Optional[float]:
+    """Seconds to wait before sending a backup request, or None to never hedge."""
+    if not Config.HEDGE_REQUESTS:
+        return None
+    threshold = latency.quantile(model, Config.HEDGE_QUANTILE)
+    return None if threshold is None else max(threshold, Config.HEDGE_MIN_DELAY)
+
+
+def _hedge_allowed(model: str) -> bool:
+    # Budgeted, so a provider that is slow across the board doesn't get double the load
+    with _stats_lock:
+        counts = _stats[model]
+        return counts["hedged"] < Config.HEDGE_MAX_FRACTION * counts["calls"]
+
+
+def _hedge_pool() -> ThreadPoolExecutor:
+    global _pool
+    with _stats_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=Config.HEDGE_POOL_SIZE, thread_name_prefix="hedge")
+        return _pool
+
+
+class _Timer:
+    """Marks when the scheduler admitted a call, so queueing never counts as provider latency."""
+
+    __slots__ = ("admitted_at",)
+
+    def __init__(self):
+        self.admitted_at = None
+
+    def admit(self):
+        self.admitted_at = time.perf_counter()
+
+    def until_hedge(self, delay: float) -> float:
+        """Seconds left before a backup is due; the clock only starts at admission."""
+        if self.admitted_at is None:
+            return delay
+        return self.admitted_at + delay - time.perf_counter()
+
+
+def _attempt(client, messages, priority, model, component, keys, accept, timer):
+    response = complete_json(client, messages, priority, model=model, component=component,
+                             expected_keys=keys, on_admit=timer.admit)
+    latency.observe(model, time.perf_counter() - timer.admitted_at)
+    return response, accept(response.choices[0].message.content)
+
+
+async def _aattempt(client, messages, priority, model, component, keys, accept, timer):
+    response = await acomplete_json(client, messages, priority, model=model, component=component,
+                                    expected_keys=keys, on_admit=timer.admit)
+    latency.observe(model, time.perf_counter() - timer.admitted_at)
+    return response, accept(response.choices[0].message.content)
+
+
+def _call(client, messages, priority, model, component, keys, accept):
+    """One model call; past the rolling p95 a backup is sent and the first valid answer wins."""
+    _count(model, "calls")
+    delay = _hedge_delay(model)
+    if delay is None:
+        return _attempt(client, messages, priority, model, component, keys, accept, _Timer())
+
+    pool = _hedge_pool()
+    timer = _Timer()
+    primary = pool.submit(_attempt, client, messages, priority, model, component, keys, accept, timer)
+    # A call still queued behind the rate limiter isn't slow, and a backup
+    # sent then would only spend RPM the limiter has already run out of
+    remaining = delay
+    while remaining > 0:
+        done, _ = wait([primary], timeout=remaining)
+        if done:
+            return primary.result()
+        remaining = timer.until_hedge(delay)
+    if not _hedge_allowed(model):
+        return primary.result()
+
+    _count(model, "hedged")
+    backup = pool.submit(_attempt, client, messages, priority, model, component, keys, accept, _Timer())
+    # The slower call can't be interrupted mid-request; it finishes in the background
+    pending, error = {primary, backup}, None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            try:
+                result = future.result()
+            except Exception as e:
+                error = error or e
+                continue
+            if future is backup:
+                _count(model, "hedge_won")
+            return result
+    raise error
+
+
+async def _acall(client, messages, priority, model, component, keys, accept):
+    """Async counterpart of _call; the losing request is cancelled."""
+    _count(model, "calls")
+    delay = _hedge_delay(model)
+    if delay is None:
+        return await _aattempt(client, messages, priority, model, component, keys, accept, _Timer())
+
+    timer = _Timer()
+    primary = asyncio.ensure_future(_aattempt(client, messages, priority, model, component, keys, accept, timer))
+    remaining = delay
+    while remaining > 0:
+        done, _ = await asyncio.wait({primary}, timeout=remaining)
+        if done:
+            return await primary
+        remaining = timer.until_hedge(delay)
+    if not _hedge_allowed(model):
+        return await primary
+
+    _count(model, "hedged")
+    backup = asyncio.ensure_future(_aattempt(client, messages, priority, model, component, keys, accept, _Timer()))
+    pending, error = {primary, backup}, None
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is not None:
+                    error = error or task.exception()
+                    continue
+                if task is backup:
+                    _count(model, "hedge_won")
+                return task.result()
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+# --- cascade --------------------------------------------------------------------
+
+def _acceptor(parse, check, component: str):
+    """Validates raw content; `check` returns a reason when a parsed answer is too weak to keep."""
+    def accept(raw: str):
+        with telemetry.span("validation", component):
+            result = parse(raw) if parse else raw
+        problem = check(result) if check else None
+        if problem:
+            raise ValueError(f"quality check failed: {problem}")
+        return result
+    return accept
+
+
+def _tiers(parse, check, component: str):
+    """(model, accept, attempts, next_model) per tier. Only escalation tiers apply `check`."""
+    models = cascade()
+    for tier, model in enumerate(models):
+        final = tier == len(models) - 1
+        yield (model, _acceptor(parse, None if final else check, component),
+               Config.PARSE_MODEL_RETRIES + 1 if final else 1, None if final else models[tier + 1])
+
+
+def _on_reject(name: str, model: str, error: Exception, next_model: Optional[str], attempt: int, attempts: int):
+    """True to retry the same model, False to escalate; re-raises once out of options.
+
+    Only a bad answer escalates (parse, validation or quality failure, or a
+    stream cut off as off-schema). Provider errors such as exhausted 429
+    retries are raised: a bigger model on the same provider won't fix them.
+    """
+    bad_answer = isinstance(error, ValueError) or getattr(error, "reason", None) == "off_schema"
+    if next_model is not None and bad_answer:
+        _count(model, "escalated")
+        logger.info(f"⤴️ {name}: {model} rejected ({str(error)[:50]}), escalating to {next_model}")
+        return False
+    if not isinstance(error, ValueError) or attempt == attempts - 1:
+        raise error
+    # Local repair already failed: a fresh generation is the last resort
+    record_model_retry(name)
+    logger.warning(f"Unrepairable {name} output ({str(error)[:50]}), asking the model again")
+    return True
+
+
+def route_json(client, messages: list, name: str, priority: int = PRIORITY_BULK, component: str = "GEOAuditor",
+               expected_keys=None, parse: Callable = None, check: Callable = None):
+    """JSON completion through the model cascade. Returns (response, parsed result).
+
+    Without GEO_MODEL_CASCADE this is one model with the usual re-generation
+    on unrepairable output. With a cascade, cheaper models answer first and
+    a call escalates when their output fails `parse` or `check`.
+    """
+    for model, accept, attempts, next_model in _tiers(parse, check, component):
+        for attempt in range(attempts):
+            try:
+                response, result = _call(client, messages, priority, model, component, expected_keys, accept)
+            except Exception as e:
+                if _on_reject(name, model, e, next_model, attempt, attempts):
+                    continue
+                break
+            _count(model, "served")
+            return response, result
+
+
+async def aroute_json(client, messages: list, name: str, priority: int = PRIORITY_BULK,
+                      component: str = "GEOAuditor", expected_keys=None, parse: Callable = None,
+                      check: Callable = None):
+    """Async counterpart of route_json for AsyncOpenAI clients."""
+    for model, accept, attempts, next_model in _tiers(parse, check, component):
+        for attempt in range(attempts):
+            try:
+                response, result = await _acall(client, messages, priority, model, component, expected_keys, accept)
+            except Exception as e:
+                if _on_reject(name, model, e, next_model, attempt, attempts):
+                    continue
+                break
+            _count(model, "served")
+            return response, result
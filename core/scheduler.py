@@ -0,0 +1,283 @@
+import time
+import heapq
+import asyncio
+import itertools
+import threading
+from contextlib import contextmanager, asynccontextmanager
+from loguru import logger
+from core.config import Config
+
+# Lower number = served first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BULK = 10
+
+_POLL = 0.05
+
+
+class TokenBucket:
+    """Classic token bucket refilled continuously at `per_minute / 60` per second."""
+
+    def __init__(self, per_minute: float, burst: float = None):
+        self.rate = per_minute / 60.0
+        self.capacity = burst if burst is not None else per_minute
+        self.level = self.capacity
+        self.stamp = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.stamp) * self.rate)
+        self.stamp = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` can be taken (0 if available now)."""
+        self._refill()
+        # A request bigger than the whole bucket is let through once it is full
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.rate
+
+    def take(self, amount: float):
+        self._refill()
+        self.level -= min(amount, self.capacity)
+
+    def adjust(self, delta: float):
+        """Corrects an earlier estimate once the real usage is known (may go negative)."""
+        self.level = min(self.capacity, self.level - delta)
+
+    def drain(self):
+        self._refill()
+        self.level = min(self.level, 0.0)
+
+
+class Ticket:
+    """One admitted (or waiting) call. Callers report usage and throttling on it."""
+
+    __slots__ = ("priority", "seq", "tokens", "granted", "started", "throttled", "congested", "failed",
+                 "tokens_used", "cancelled")
+
+    def __init__(self, priority: int, seq: int, tokens: int):
+        self.priority = priority
+        self.seq = seq
+        self.tokens = tokens
+        self.granted = False
+        self.started = 0.0
+        self.throttled = False
+        self.congested = False  # timed out or 5xx: the provider is overloaded, back off like a 429
+        self.failed = False     # any other error; neither healthy nor a congestion signal
+        self.tokens_used = None
+        self.cancelled = False  # we abandoned the call ourselves; its latency says nothing
+
+    def __lt__(self, other):
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class ProviderLimiter:
+    """Per-provider admission control.
+
+    Requests/min and tokens/min are enforced with token buckets, and the
+    number of in-flight calls follows AIMD: +1/limit per successful call,
+    halved on a 429, a timeout or a 5xx, trimmed when latency climbs well
+    above its baseline. Only successful calls feed the latency averages.
+    Waiters are served strictly by (priority, arrival).
+    """
+
+    def __init__(self, name: str, rpm: float, tpm: float, max_concurrency: int, min_concurrency: int = 1):
+        self.name = name
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.limit = float(max(min_concurrency, min(4, max_concurrency)))
+        self.in_flight = 0
+
+        self.latency_ewma = None
+        self.latency_baseline = None
+        self.throttle_count = 0
+        self.congestion_count = 0
+        self.completed = 0
+
+        self._waiting = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+
+    # --- admission ---
+    def _enqueue(self, priority: int, tokens: int) -> Ticket:
+        ticket = Ticket(priority, next(self._seq), tokens)
+        with self._cond:
+            heapq.heappush(self._waiting, ticket)
+        return ticket
+
+    def _try_grant(self, ticket: Ticket) -> float:
+        """Grants the ticket if possible; otherwise returns how long to wait. Lock held."""
+        if self._waiting[0] is not ticket or self.in_flight >= int(self.limit):
+            return _POLL
+        wait = max(self.requests.wait_time(1), self.tokens.wait_time(ticket.tokens))
+        if wait > 0:
+            return wait
+
+        heapq.heappop(self._waiting)
+        self.requests.take(1)
+        self.tokens.take(ticket.tokens)
+        self.in_flight += 1
+        ticket.granted = True
+        ticket.started = time.monotonic()
+        self._cond.notify_all()
+        return 0.0
+
+    def _abandon(self, ticket: Ticket):
+        with self._cond:
+            if not ticket.granted and ticket in self._waiting:
+                self._waiting.remove(ticket)
+                heapq.heapify(self._waiting)
+                self._cond.notify_all()
+
+    def acquire(self, priority: int, tokens: int) -> Ticket:
+        ticket = self._enqueue(priority, tokens)
+        try:
+            with self._cond:
+                while True:
+                    wait = self._try_grant(ticket)
+                    if wait == 0:
+                        return ticket
+                    self._cond.wait(timeout=wait)
+        except BaseException:
+            self._abandon(ticket)
+            raise
+
+    async def acquire_async(self, priority: int, tokens: int) -> Ticket:
+        ticket = self._enqueue(priority, tokens)
+        try:
+            while True:
+                with self._cond:
+                    wait = self._try_grant(ticket)
+                if wait == 0:
+                    return ticket
+                await asyncio.sleep(min(wait, 1.0) if wait > _POLL else _POLL)
+        except BaseException:
+            self._abandon(ticket)
+            raise
+
+    # --- feedback ---
+    def release(self, ticket: Ticket):
+        latency = time.monotonic() - ticket.started
+        with self._cond:
+            self.in_flight -= 1
+            self.completed += 1
+
+            if ticket.tokens_used is not None:
+                self.tokens.adjust(ticket.tokens_used - ticket.tokens)
+
+            if ticket.throttled:
+                # Multiplicative decrease and stop admitting until the bucket refills
+                self.throttle_count += 1
+                self.limit = max(self.min_concurrency, self.limit / 2)
+                self.requests.drain()
+                logger.warning(f"🚦 {self.name} throttled, concurrency limit -> {int(self.limit)}")
+            elif ticket.congested:
+                # Same decrease, but the request quota isn't exhausted, so the bucket is left alone
+                self.congestion_count += 1
+                self.limit = max(self.min_concurrency, self.limit / 2)
+                logger.warning(f"🚦 {self.name} timing out or failing, concurrency limit -> {int(self.limit)}")
+            elif not ticket.cancelled and not ticket.failed:
+                self.latency_ewma = latency if self.latency_ewma is None else 0.8 * self.latency_ewma + 0.2 * latency
+                # Slow-moving baseline: noisy but steady providers should not look degraded
+                self.latency_baseline = (latency if self.latency_baseline is None
+                                         else 0.98 * self.latency_baseline + 0.02 * latency)
+                if self.latency_ewma > Config.SCHED_LATENCY_BACKOFF * self.latency_baseline:
+                    self.limit = max(self.min_concurrency, self.limit * 0.9)
+                else:
+                    # Additive increase: roughly +1 per full window of healthy calls
+                    self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+            self._cond.notify_all()
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "concurrency_limit": round(self.limit, 2),
+                "in_flight": self.in_flight,
+                "waiting": len(self._waiting),
+                "completed": self.completed,
+                "throttled": self.throttle_count,
+                "congested": self.congestion_count,
+                "latency_ewma": self.latency_ewma,
+                "latency_baseline": self.latency_baseline,
+            }
+
+
+def _is_throttle(error: BaseException) -> bool:
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status == 429
+
+
+def _is_congestion(error: BaseException) -> bool:
+    """Timeouts (openai, requests, httpx, asyncio) and provider-side 5xx."""
+    if isinstance(error, TimeoutError) or "Timeout" in type(error).__name__:
+        return True
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return isinstance(status, int) and status >= 500
+
+
+def _mark_failure(ticket: Ticket, error: BaseException):
+    ticket.throttled = ticket.throttled or _is_throttle(error)
+    ticket.congested = ticket.congested or _is_congestion(error)
+    ticket.failed = True
+
+
+class Scheduler:
+    """Process-wide gate every outbound LLM and search call goes through."""
+
+    def __init__(self, limits: dict = None):
+        limits = limits or Config.PROVIDER_LIMITS
+        self.providers = {name: ProviderLimiter(name, **cfg) for name, cfg in limits.items()}
+
+    @contextmanager
+    def slot(self, provider: str, priority: int = PRIORITY_BULK, tokens: int = 1):
+        limiter = self.providers[provider]
+        ticket = limiter.acquire(priority, tokens)
+        try:
+            yield ticket
+        except BaseException as e:
+            _mark_failure(ticket, e)
+            raise
+        finally:
+            limiter.release(ticket)
+
+    @asynccontextmanager
+    async def aslot(self, provider: str, priority: int = PRIORITY_BULK, tokens: int = 1):
+        limiter = self.providers[provider]
+        ticket = await limiter.acquire_async(priority, tokens)
+        try:
+            yield ticket
+        except BaseException as e:
+            _mark_failure(ticket, e)
+            # A hedged request that lost the race is cancelled, not slow
+            ticket.cancelled = ticket.cancelled or isinstance(e, asyncio.CancelledError)
+            raise
+        finally:
+            limiter.release(ticket)
+
+    def stats(self) -> dict:
+        return {name: limiter.stats() for name, limiter in self.providers.items()}
+
+
+def estimate_tokens(messages: list, completion: int = None) -> int:
+    """Cheap prompt+completion estimate (~4 chars/token) used before usage is known."""
+    chars = sum(len(str(m.get("content", ""))) for m in messages)
+    return chars // 4 + (completion if completion is not None else Config.SCHED_EST_COMPLETION_TOKENS)
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> Scheduler:
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = Scheduler()
+        return _scheduler
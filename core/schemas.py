@@ -31,14 +31,39 @@ class AuditReport(BaseModel):
     hallucinations: Optional[List[dict]] = None
 
 
+class TopicFinding(BaseModel):
+    topic: str
+    leaders: List[str]  # brands AI answers recommend for this topic, strongest first
+    client_mentioned: bool
+
+
 class CompetitorAnalysis(BaseModel):
     market_query: str
     leaderboard: List[CompetitorMetrics]
     citation_gaps: List[str] = Field(description="Topics competitors win that we miss")
+    unresearched: List[str] = []  # brands left off the leaderboard because their research failed
 
     # comparison report
 class ComparisonReport(BaseModel):
     brand_a: AuditReport
     brand_b: AuditReport
     market_niche: str
-    winner_summary: str  # AI's analysis of who is currently winning
\ No newline at end of file
+    winner_summary: str  # AI's analysis of who is currently winning
+    winner: Optional[str] = None  # brand_name of the stronger brand, if the model named one
+
+
+class Standing(BaseModel):
+    rank: int
+    brand_name: str
+    visibility_score: float
+    wins: int = 0
+    rationale: str = ""
+
+
+class TournamentReport(BaseModel):
+    market_niche: str
+    mode: str  # "ranking" (one league call) or "pairwise" (round robin)
+    standings: List[Standing]
+    summary: str
+    reports: List[AuditReport]
+    matches: List[ComparisonReport] = []
\ No newline at end of file
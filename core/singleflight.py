@@ -0,0 +1,86 @@
+import copy
+import asyncio
+import threading
+from collections import Counter, defaultdict
+from concurrent.futures import Future
+
+_stats = defaultdict(Counter)
+_lock = threading.Lock()
+_inflight = {}  # (name, key) -> Future of the leader's call
+
+
+class _LeaderCancelled(Exception):
+    """The call a follower was waiting on was cancelled; the follower runs it instead."""
+
+
+def singleflight_stats() -> dict:
+    """Per-call-site counts: 'calls' that reached the provider and 'coalesced' duplicates."""
+    with _lock:
+        return {name: dict(counts) for name, counts in _stats.items()}
+
+
+def _join(name: str, key: str):
+    """Returns (future, leader). The first caller for a key leads; the rest follow."""
+    with _lock:
+        future = _inflight.get((name, key))
+        if future is not None:
+            _stats[name]["coalesced"] += 1
+            return future, False
+        future = _inflight[(name, key)] = Future()
+        _stats[name]["calls"] += 1
+        return future, True
+
+
+def _settle(name: str, key: str, future: Future, result=None, error: BaseException = None):
+    with _lock:
+        _inflight.pop((name, key), None)
+    if error is None:
+        # A snapshot: the leader is free to mutate its own result right away
+        future.set_result(copy.deepcopy(result))
+    elif not isinstance(error, Exception):  # cancelled or interrupted, not failed
+        future.set_exception(_LeaderCancelled())
+    else:
+        future.set_exception(error)
+
+
+def do(name: str, key: str, fn, *args, **kwargs):
+    """Runs fn(*args, **kwargs) once for all concurrent callers with the same key.
+
+    Works across threads and event loops: a sync caller can follow an async
+    leader and vice versa. Followers get deep copies of a snapshot taken as
+    the leader finishes, so mutating a shared report can't leak between
+    pipelines. Errors are shared too.
+    """
+    while True:
+        future, leader = _join(name, key)
+        if leader:
+            try:
+                result = fn(*args, **kwargs)
+            except BaseException as e:
+                _settle(name, key, future, error=e)
+                raise
+            _settle(name, key, future, result)
+            return result
+        try:
+            return copy.deepcopy(future.result())
+        except _LeaderCancelled:
+            continue
+
+
+async def ado(name: str, key: str, fn, *args, **kwargs):
+    """Async counterpart of do(); `fn` is a coroutine function."""
+    while True:
+        future, leader = _join(name, key)
+        if leader:
+            try:
+                result = await fn(*args, **kwargs)
+            except BaseException as e:
+                _settle(name, key, future, error=e)
+                raise
+            _settle(name, key, future, result)
+            return result
+        try:
+            # Shielded so a follower timing out doesn't cancel the leader's future
+            return copy.deepcopy(await asyncio.shield(asyncio.wrap_future(future)))
+        except _LeaderCancelled:
+            continue
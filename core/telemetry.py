@@ -0,0 +1,262 @@
+import json
+import time
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from loguru import logger
+from core.config import Config
+
+# Seconds; tuned for sub-second local work up to multi-second LLM calls
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+class Histogram:
+    __slots__ = ("counts", "sum", "count", "max")
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.sum = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.sum += value
+        self.count += 1
+        self.max = max(self.max, value)
+
+    def merge(self, other: dict):
+        self.counts = [a + b for a, b in zip(self.counts, other["counts"])]
+        self.sum += other["sum"]
+        self.count += other["count"]
+        self.max = max(self.max, other["max"])
+
+    def quantile(self, q: float) -> float:
+        """Prometheus-style histogram_quantile with linear interpolation."""
+        if not self.count:
+            return 0.0
+        target, seen, lower = q * self.count, 0, 0.0
+        for bound, n in zip(BUCKETS, self.counts):
+            if seen + n >= target and n:
+                return lower + (bound - lower) * (target - seen) / n
+            seen += n
+            lower = bound
+        return self.max
+
+    def to_dict(self) -> dict:
+        return {"counts": list(self.counts), "sum": self.sum, "count": self.count, "max": self.max}
+
+
+class Telemetry:
+    """In-process registry of stage spans, errors and token usage.
+
+    Stages: search, llm_call, ttft, validation, pdf_render, disk_write. Each
+    observation is labelled with the component that produced it (GEOAuditor,
+    CompetitorAgent, PerplexitySearch, GEOReporter).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._scopes = []
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.durations = {}
+            self.errors = {}
+            self.tokens = {}
+            self.started = time.time()
+
+    # --- scopes ---
+    def open_scope(self) -> "Telemetry":
+        """A child registry that also receives everything recorded here until close_scope().
+
+        Lets one run report its own spans and tokens without resetting the
+        counters other pipelines in the process are still using.
+        """
+        scope = Telemetry()
+        with self._lock:
+            self._scopes.append(scope)
+        return scope
+
+    def close_scope(self, scope: "Telemetry"):
+        with self._lock:
+            if scope in self._scopes:
+                self._scopes.remove(scope)
+
+    # --- recording ---
+    def observe(self, stage: str, component: str, seconds: float, error: bool = False):
+        key = (stage, component)
+        with self._lock:
+            self.durations.setdefault(key, Histogram()).observe(seconds)
+            if error:
+                self.errors[key] = self.errors.get(key, 0) + 1
+            scopes = list(self._scopes)
+        for scope in scopes:
+            scope.observe(stage, component, seconds, error)
+
+    @contextmanager
+    def span(self, stage: str, component: str):
+        started = time.perf_counter()
+        failed = False
+        try:
+            yield
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            self.observe(stage, component, time.perf_counter() - started, error=failed)
+
+    def record_tokens(self, component: str, model: str, prompt_tokens: int, completion_tokens: int):
+        key = (component, model)
+        with self._lock:
+            usage = self.tokens.setdefault(key, {"calls": 0, "prompt": 0, "completion": 0})
+            usage["calls"] += 1
+            usage["prompt"] += prompt_tokens or 0
+            usage["completion"] += completion_tokens or 0
+            scopes = list(self._scopes)
+        for scope in scopes:
+            scope.record_tokens(component, model, prompt_tokens, completion_tokens)
+
+    def record_usage(self, component: str, model: str, usage):
+        """Accepts an OpenAI usage object or a plain dict (Perplexity)."""
+        if usage is None:
+            return
+        if isinstance(usage, dict):
+            self.record_tokens(component, model, usage.get("prompt_tokens"), usage.get("completion_tokens"))
+        else:
+            self.record_tokens(component, model, usage.prompt_tokens, usage.completion_tokens)
+
+    # --- cross-process ---
+    def drain(self) -> dict:
+        """Snapshot-and-reset, used to ship a worker process's spans to the parent."""
+        with self._lock:
+            snapshot = {
+                "durations": [(k, h.to_dict()) for k, h in self.durations.items()],
+                "errors": list(self.errors.items()),
+                "tokens": list(self.tokens.items()),
+            }
+        self.reset()
+        return snapshot
+
+    def merge(self, snapshot: dict):
+        with self._lock:
+            for key, hist in snapshot["durations"]:
+                self.durations.setdefault(tuple(key), Histogram()).merge(hist)
+            for key, count in snapshot["errors"]:
+                self.errors[tuple(key)] = self.errors.get(tuple(key), 0) + count
+            for key, usage in snapshot["tokens"]:
+                mine = self.tokens.setdefault(tuple(key), {"calls": 0, "prompt": 0, "completion": 0})
+                for field in mine:
+                    mine[field] += usage[field]
+            scopes = list(self._scopes)
+        for scope in scopes:
+            scope.merge(snapshot)
+
+    # --- reporting ---
+    @staticmethod
+    def cost(model: str, prompt: int, completion: int) -> float:
+        price_in, price_out = Config.MODEL_PRICING.get(model, (0.0, 0.0))
+        return (prompt * price_in + completion * price_out) / 1_000_000
+
+    def summary(self) -> dict:
+        with self._lock:
+            stages = {}
+            for (stage, component), hist in sorted(self.durations.items()):
+                stages.setdefault(stage, {})[component] = {
+                    "count": hist.count,
+                    "errors": self.errors.get((stage, component), 0),
+                    "total_s": round(hist.sum, 3),
+                    "mean_s": round(hist.sum / hist.count, 4) if hist.count else 0.0,
+                    "p50_s": round(hist.quantile(0.5), 4),
+                    "p95_s": round(hist.quantile(0.95), 4),
+                    "max_s": round(hist.max, 4),
+                }
+            tokens, total_cost = {}, 0.0
+            for (component, model), usage in sorted(self.tokens.items()):
+                cost = self.cost(model, usage["prompt"], usage["completion"])
+                total_cost += cost
+                tokens.setdefault(component, {})[model] = dict(usage, cost_usd=round(cost, 6))
+            return {
+                "wall_clock_s": round(time.time() - self.started, 3),
+                "stages": stages,
+                "tokens": tokens,
+                "cost_usd": round(total_cost, 6),
+            }
+
+    def prometheus(self) -> str:
+        lines = [
+            "# HELP geo_stage_duration_seconds Wall-clock time per pipeline stage.",
+            "# TYPE geo_stage_duration_seconds histogram",
+        ]
+        with self._lock:
+            for (stage, component), hist in sorted(self.durations.items()):
+                labels = f'stage="{stage}",component="{component}"'
+                cumulative = 0
+                for bound, n in zip(BUCKETS, hist.counts):
+                    cumulative += n
+                    lines.append(f'geo_stage_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f'geo_stage_duration_seconds_bucket{{{labels},le="+Inf"}} {hist.count}')
+                lines.append(f"geo_stage_duration_seconds_sum{{{labels}}} {hist.sum:.6f}")
+                lines.append(f"geo_stage_duration_seconds_count{{{labels}}} {hist.count}")
+
+            lines += ["# HELP geo_stage_errors_total Failed spans per stage.", "# TYPE geo_stage_errors_total counter"]
+            for (stage, component), count in sorted(self.errors.items()):
+                lines.append(f'geo_stage_errors_total{{stage="{stage}",component="{component}"}} {count}')
+
+            lines += ["# HELP geo_tokens_total Tokens reported by provider APIs.", "# TYPE geo_tokens_total counter"]
+            cost_lines = ["# HELP geo_cost_usd_total Estimated spend from Config.MODEL_PRICING.",
+                          "# TYPE geo_cost_usd_total counter"]
+            for (component, model), usage in sorted(self.tokens.items()):
+                labels = f'component="{component}",model="{model}"'
+                lines.append(f'geo_tokens_total{{{labels},kind="prompt"}} {usage["prompt"]}')
+                lines.append(f'geo_tokens_total{{{labels},kind="completion"}} {usage["completion"]}')
+                cost_lines.append(f"geo_cost_usd_total{{{labels}}} "
+                                  f"{self.cost(model, usage['prompt'], usage['completion']):.6f}")
+        return "\n".join(lines + cost_lines) + "\n"
+
+    def export_prometheus(self, path=None):
+        path = path or Config.METRICS_FILE
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(self.prometheus(), encoding="utf-8")
+        tmp.replace(path)  # atomic for textfile collectors
+        return path
+
+    def write_summary(self, path, extra: dict = None):
+        payload = dict(extra or {}, telemetry=self.summary())
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(payload, indent=2, default=str), encoding="utf-8")
+        return path
+
+
+telemetry = Telemetry()
+span = telemetry.span
+
+
+def start_metrics_server(port: int = None, host: str = "127.0.0.1"):
+    """Serves /metrics in Prometheus text format from a daemon thread."""
+    port = port or Config.METRICS_PORT
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            if self.path != "/metrics":
+                self.send_error(404)
+                return
+            body = telemetry.prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    logger.info(f"📈 Metrics at http://{host}:{port}/metrics")
+    return server
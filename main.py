@@ -1,70 +1,334 @@
-import json
+import time
+import asyncio
+import itertools
 import webbrowser
 from datetime import datetime
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 from loguru import logger
 from core.config import Config
-from agents.auditor import GEOAuditor
+from core.cache import get_llm_cache
+from core.parsing import parse_stats
+from core.singleflight import singleflight_stats
+from core.routing import routing_stats
+from core.scheduler import PRIORITY_BULK, PRIORITY_INTERACTIVE, get_scheduler
+from core.history import VisibilityStore
+from core.telemetry import telemetry
+from core.ingest import ProgressJournal, client_key, find_client_file, iter_clients, iter_niche_batches
+from core.ledger import AuditLedger
+from agents.auditor import GEOAuditor, AsyncGEOAuditor, audit_fingerprint
+from core.schemas import AuditReport, Standing, TournamentReport
 from tools.reporter import GEOReporter
+from tools.render_stage import ReportRenderStage
 
-def run_bulk_audits():
-    """PHASE 1: Loop through all companies in the JSON database."""
+def load_clients(journal=None):
+    """Streams the client database, or returns None if it is missing."""
     Config.initialize_directories()
-    client_file = Config.DATA_DIR / "clients.json"
+    client_file = find_client_file()
     
-    if not client_file.exists():
-        logger.error(f"Client file not found at {client_file}")
-        return
+    if client_file is None:
+        logger.error(f"Client file not found at {Config.DATA_DIR / 'clients.jsonl'} or clients.json")
+        return None
 
-    with open(client_file, 'r') as f:
-        clients = json.load(f)
+    logger.info(f"Streaming clients from {client_file.name}")
+    clients = iter_clients(client_file)
+    return journal.pending(clients) if journal else clients
 
-    stats = {"success": [], "failed": []}
-    logger.info(f"Loaded {len(clients)} clients. Starting engine...")
-    
-    auditor = GEOAuditor()
 
-    for client in clients:
-        brand = client['brand_name']
-        niche = client['niche']
-        logger.info(f">>> Auditing: {brand}")
-        
-        try:
-            report_data = auditor.perform_audit(brand, niche)
-            reporter = GEOReporter()
-            
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M")
-            filename = f"{brand.replace(' ', '_')}_Audit_{timestamp}.pdf"
-            output_path = Config.REPORTS_DIR / filename
-            
-            reporter.generate_report(report_data.model_dump(), str(output_path))
-            
-            stats["success"].append(brand)
-            logger.success(f"Done: {brand}")
-            
-        except Exception as e:
-            stats["failed"].append({"brand": brand, "error": str(e)[:50]})
-            logger.error(f"Failed: {brand}")
+def audit_pdf_path(brand):
+    """Where a brand's audit PDF is written in reports/."""
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M")
+    filename = f"{brand.replace(' ', '_')}_Audit_{timestamp}.pdf"
+    return Config.REPORTS_DIR / filename
 
-    # --- Print Agency Dashboard Summary ---
+
+def print_batch_summary(stats, elapsed=None):
+    """Prints the Agency Dashboard for a finished batch."""
     print("\n" + "="*50)
     print(f"🚀 {Config.AGENCY_NAME} BATCH SUMMARY")
     print("="*50)
     print(f"✅ SUCCESSFULLY AUDITED: {len(stats['success'])}")
     for b in stats["success"]: print(f"  - {b}")
     
+    if stats.get("reused"):
+        print(f"♻️ REUSED (unchanged & fresh): {stats['reused']}")
+        for b in stats.get("reused_reports", {}): print(f"  - {b} -> {stats['reports'][b]}")
+    
     print(f"\n❌ FAILED AUDITS: {len(stats['failed'])}")
     for f in stats["failed"]: print(f"  - {f['brand']}: {f['error']}")
+    if stats.get("render_failed"):
+        print(f"\n🖨️ RENDER FAILURES (audit kept as JSON): {len(stats['render_failed'])}")
+        for f in stats["render_failed"]: print(f"  - {f['brand']}: {f['error']} -> {f['audit_json']}")
+    if elapsed is not None:
+        total = len(stats['success']) + len(stats['failed'])
+        print(f"\n⏱️ {total} brands in {elapsed:.1f}s")
+    usage = stats.get("telemetry") or telemetry.summary()
+    for component, models in usage["tokens"].items():
+        for model, u in models.items():
+            print(f"🧮 {component} [{model}]: {u['prompt']} in / {u['completion']} out tokens, ${u['cost_usd']:.4f}")
+    if stats.get("summary_path"):
+        print(f"📈 Run summary: {stats['summary_path']}")
+    cache = get_llm_cache().stats()
+    print(f"💾 LLM cache: {sum(cache['hits'].values())} hits / {sum(cache['misses'].values())} misses")
+    repaired = sum(c.get("repaired", 0) for c in parse_stats().values())
+    if repaired:
+        print(f"🩹 JSON repaired locally: {repaired} (round trips saved)")
+    coalesced = sum(c.get("coalesced", 0) for c in singleflight_stats().values())
+    if coalesced:
+        print(f"🔗 Duplicate in-flight calls coalesced: {coalesced}")
+    if Config.MODEL_CASCADE or Config.HEDGE_REQUESTS:
+        for model, counts in routing_stats().items():
+            print(f"🧭 {model}: {counts.get('served', 0)} served, {counts.get('escalated', 0)} escalated, "
+                  f"{counts.get('hedged', 0)} hedged ({counts.get('hedge_won', 0)} won)")
+    for provider, sched in get_scheduler().stats().items():
+        if sched["completed"]:
+            print(f"🚦 {provider}: {sched['completed']} calls, {sched['throttled']} throttled, "
+                  f"{sched['congested']} timed out/5xx, limit {sched['concurrency_limit']}")
     print("="*50 + "\n")
 
 
-def run_competitive_battle(brand_a, brand_b, niche):
-    """PHASE 2: Create a side-by-side comparison for a specific rivalry."""
+class BulkRun:
+    """Per-run sinks shared by the sync and async engines.
+
+    A finished audit is queued for rendering, journaled for --resume,
+    appended to the visibility history and stored in the audit ledger;
+    failures are journaled and shown on the dashboard. In incremental mode
+    brands whose inputs are unchanged and whose last audit is fresh are
+    reused instead of re-audited.
+    """
+
+    def __init__(self, journal, incremental=False):
+        self.journal = journal
+        self.incremental = incremental
+        self.stats = {"success": [], "failed": [], "reused": 0, "reports": {}, "reused_reports": []}
+        self.renderer = ReportRenderStage()
+        self.history = VisibilityStore()
+        self.ledger = AuditLedger()
+        # Spans and token counts of this run only; the process-wide counters keep running
+        self.telemetry = telemetry.open_scope()
+
+    def pending(self, clients):
+        """Filters the stream down to brands that actually need an audit."""
+        if not self.incremental:
+            return clients
+        return self.ledger.stale(
+            clients,
+            key_fn=client_key,
+            fingerprint_fn=lambda c: audit_fingerprint(c['brand_name'], c['niche']),
+            on_fresh=self.reuse
+        )
+
+    def reuse(self, client, entry):
+        brand = client['brand_name']
+        pdf_path = entry["pdf_path"]
+        # Only re-render (no tokens) if the previous PDF has gone missing
+        if not pdf_path or not Path(pdf_path).exists():
+            pdf_path = str(audit_pdf_path(brand))
+            self.renderer.submit(brand, entry["report"], pdf_path)
+            self.ledger.set_pdf_path(client_key(client), pdf_path)
+        self.stats["reports"][brand] = pdf_path
+        self.stats["reused_reports"].append(brand)
+        self.stats["reused"] += 1
+        self.journal.record(client, "reused")
+        logger.info(f"♻️ Unchanged: {brand}")
+
+    def succeed(self, client, report):
+        brand = client['brand_name']
+        output_path = audit_pdf_path(brand)
+        report_data = report.model_dump()
+        self.renderer.submit(brand, report_data, output_path)
+        self.history.append_audit(report, client['niche'], run_id=self.journal.run_id)
+        self.ledger.record(client_key(client), audit_fingerprint(brand, client['niche']), report_data, str(output_path))
+        self.stats["success"].append(brand)
+        self.stats["reports"][brand] = str(output_path)
+        self.journal.record(client, "success")
+        logger.success(f"Done: {brand}")
+
+    def fail(self, client, error):
+        brand = client['brand_name']
+        self.stats["failed"].append({"brand": brand, "error": error[:50]})
+        self.journal.record(client, "failed", error[:200])
+        logger.error(f"Failed: {brand}")
+
+    def close(self):
+        try:
+            self.renderer.close()
+            self.history.flush()
+        finally:
+            self.ledger.close()
+            self.journal.close()
+        self.stats["render_failed"] = self.renderer.failed
+        telemetry.close_scope(self.telemetry)
+
+        # Per-run JSON summary next to the journal, plus the Prometheus textfile
+        summary_path = self.journal.path.with_suffix(".summary.json")
+        self.telemetry.write_summary(summary_path, {
+            "run_id": self.journal.run_id,
+            "succeeded": len(self.stats["success"]),
+            "failed": len(self.stats["failed"]),
+            "reused": self.stats["reused"],
+            "render_failed": len(self.stats["render_failed"]),
+            "reports": self.stats["reports"],
+        })
+        telemetry.export_prometheus()
+        self.stats["summary_path"] = str(summary_path)
+        self.stats["telemetry"] = self.telemetry.summary()
+        return self.stats
+
+
+def _audit_one(auditor, run, client):
+    """Sync engine step: audit one client and hand the result to the run."""
+    brand = client['brand_name']
+    logger.info(f">>> Auditing: {brand}")
+    
+    try:
+        report_data = auditor.perform_audit(brand, client['niche'])
+    except Exception as e:
+        run.fail(client, str(e))
+        return
+    run.succeed(client, report_data)
+
+
+def _audit_batch(auditor, run, batch):
+    """Sync engine step for a same-niche batch; rejected entries fall back to single audits."""
+    reports, rejected = auditor.perform_batch_audit([c['brand_name'] for c in batch], batch[0]['niche'])
+
+    for client in batch:
+        brand = client['brand_name']
+        if brand in rejected or brand not in reports:
+            _audit_one(auditor, run, client)
+        else:
+            run.succeed(client, reports[brand])
+
+
+def run_bulk_audits(run_id=None, resume=False, batch_size=None, incremental=None):
+    """PHASE 1: Loop through all companies in the JSON database."""
+    journal = ProgressJournal(run_id, resume=resume)
+    clients = load_clients(journal)
+    if clients is None:
+        journal.close()
+        return
+
+    logger.info(f"Run {journal.run_id}: starting engine...")
+    batch_size = batch_size or Config.AUDIT_BATCH_SIZE
+    incremental = Config.INCREMENTAL if incremental is None else incremental
     auditor = GEOAuditor()
+    started = time.perf_counter()
+
+    # PDFs render in worker processes while the next audit is on the wire
+    run = BulkRun(journal, incremental)
+    clients = run.pending(clients)
+    try:
+        if batch_size > 1:
+            for batch in iter_niche_batches(clients, batch_size):
+                _audit_batch(auditor, run, batch)
+        else:
+            for client in clients:
+                _audit_one(auditor, run, client)
+    finally:
+        stats = run.close()
+
+    # --- Print Agency Dashboard Summary ---
+    print_batch_summary(stats, time.perf_counter() - started)
+    return stats
+
+
+async def _audit_one_async(auditor, run, client, brand_timeout):
+    """Async engine step; blocking sinks (render queue, journal fsync) run off the loop."""
+    brand = client['brand_name']
+    logger.info(f">>> Auditing: {brand}")
+
+    try:
+        report_data = await asyncio.wait_for(
+            auditor.perform_audit(brand, client['niche']), timeout=brand_timeout
+        )
+    except asyncio.TimeoutError:
+        await asyncio.to_thread(run.fail, client, f"Timed out after {brand_timeout}s")
+        return
+    except Exception as e:
+        await asyncio.to_thread(run.fail, client, str(e))
+        return
+    await asyncio.to_thread(run.succeed, client, report_data)
+
+
+async def _audit_batch_async(auditor, run, batch, brand_timeout):
+    """Async engine step for a same-niche batch; rejected entries fall back to single audits."""
+    brands = [c['brand_name'] for c in batch]
+    try:
+        reports, rejected = await asyncio.wait_for(
+            auditor.perform_batch_audit(brands, batch[0]['niche']), timeout=brand_timeout
+        )
+    except asyncio.TimeoutError:
+        logger.warning(f"Batch of {len(batch)} timed out, re-queuing individually")
+        reports, rejected = {}, brands
+
+    for client in batch:
+        brand = client['brand_name']
+        if brand in rejected or brand not in reports:
+            await _audit_one_async(auditor, run, client, brand_timeout)
+        else:
+            await asyncio.to_thread(run.succeed, client, reports[brand])
+
+
+async def _bulk_audit_async(clients, concurrency, brand_timeout, journal, batch_size=1, incremental=False):
+    auditor = AsyncGEOAuditor()
+    run = BulkRun(journal, incremental)
+    clients = run.pending(clients)
+    batches = iter_niche_batches(clients, batch_size) if batch_size > 1 else None
+
+    async def worker():
+        # Workers pull from the shared stream, so only `concurrency` clients are ever in memory
+        if batches is not None:
+            for batch in batches:
+                await _audit_batch_async(auditor, run, batch, brand_timeout)
+        else:
+            for client in clients:
+                await _audit_one_async(auditor, run, client, brand_timeout)
+
+    try:
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    finally:
+        await auditor.close()
+        stats = await asyncio.to_thread(run.close)
+    return stats
+
+
+def run_bulk_audits_async(concurrency=None, brand_timeout=None, run_id=None, resume=False, batch_size=None,
+                          incremental=None):
+    """PHASE 1 (async): Audits many clients concurrently against the Groq endpoint."""
+    concurrency = concurrency or Config.BULK_CONCURRENCY
+    brand_timeout = brand_timeout or Config.BRAND_TIMEOUT
+    batch_size = batch_size or Config.AUDIT_BATCH_SIZE
+    incremental = Config.INCREMENTAL if incremental is None else incremental
+
+    journal = ProgressJournal(run_id, resume=resume)
+    clients = load_clients(journal)
+    if clients is None:
+        journal.close()
+        return
+
+    logger.info(f"Run {journal.run_id}: starting async engine (concurrency={concurrency})...")
+    started = time.perf_counter()
+    stats = asyncio.run(_bulk_audit_async(clients, concurrency, brand_timeout, journal, batch_size, incremental))
+
+    # --- Print Agency Dashboard Summary ---
+    print_batch_summary(stats, time.perf_counter() - started)
+    return stats
+
+
+def run_competitive_battle(brand_a, brand_b, niche, open_report=True, priority=PRIORITY_INTERACTIVE):
+    """PHASE 2: Create a side-by-side comparison for a specific rivalry."""
+    # Interactive by default: jumps ahead of any bulk audits sharing the scheduler
+    auditor = GEOAuditor(priority=priority)
     
     # 1. Audit both brands
     report_a = auditor.perform_audit(brand_a, niche)
     report_b = auditor.perform_audit(brand_b, niche)
     
+    with VisibilityStore() as history:
+        history.append_audit(report_a, niche)
+        history.append_audit(report_b, niche)
+    
     # 2. Get the Competitive Analysis from AI
     battle_logic = auditor.compare_brands(report_a, report_b, niche)
     
@@ -82,25 +346,235 @@ def run_competitive_battle(brand_a, brand_b, niche):
     
     # 4. Success message and automatic opening
     logger.success(f"⚔️ Battle Report Generated: {output_path}")
-    webbrowser.open(str(output_path))
+    if open_report:
+        webbrowser.open(str(output_path))
+    return battle_logic
 
 
-if __name__ == "__main__":
-    # --- Execute BOTH Options Sequentially ---
-    
-    # Step 1: Process every company in your large JSON file
-    logger.info("🎬 STARTING ACT 1: BULK AUDITS")
-    run_bulk_audits()
-
-    # Step 2: Run the specific Competitive Battle
-    print("\n" + "!"*50)
-    logger.info("🎬 STARTING ACT 2: COMPETITIVE BATTLE")
-    print("!"*50 + "\n")
-
-    run_competitive_battle(
-        brand_a="SpaceX", 
-        brand_b="Blue Origin", 
-        niche="Aerospace"
+def _league_audits(auditor, brands, niche, history):
+    """Audits every brand exactly once, reusing fresh ledger entries where possible."""
+    ledger = AuditLedger()
+
+    def audit(brand):
+        client = {"brand_name": brand, "niche": niche}
+        fingerprint = audit_fingerprint(brand, niche)
+        entry = ledger.lookup(client_key(client), fingerprint)
+        if entry is not None:
+            logger.info(f"♻️ Reusing audit: {brand}")
+            return AuditReport.model_validate(entry["report"])
+        report = auditor.perform_audit(brand, niche)
+        history.append_audit(report, niche)
+        ledger.record(client_key(client), fingerprint, report.model_dump())
+        return report
+
+    try:
+        with ThreadPoolExecutor(max_workers=min(Config.BULK_CONCURRENCY, len(brands))) as pool:
+            return list(pool.map(audit, brands))
+    finally:
+        ledger.close()
+
+
+def run_tournament(brands, niche, mode="ranking", open_report=True, priority=PRIORITY_INTERACTIVE):
+    """PHASE 2b: Rank a whole niche in one league instead of N*(N-1)/2 battles.
+
+    Each brand is audited once (O(N) audits). mode="ranking" then makes a
+    single multi-brand ranking call; mode="pairwise" runs every
+    compare_brands match concurrently and ranks by wins.
+    """
+    # One audit per brand, however the list was spelled
+    brands = list({" ".join(b.split()).casefold(): b for b in reversed(brands)}.values())[::-1]
+    if len(brands) < 2:
+        raise ValueError("A tournament needs at least two brands")
+
+    auditor = GEOAuditor(priority=priority)
+    logger.info(f"🏟️ Tournament: {len(brands)} brands in {niche} ({mode})")
+
+    # 1. Audit the field
+    with VisibilityStore() as history:
+        reports = _league_audits(auditor, brands, niche, history)
+    # The model may rename a brand; key everything by what we asked for
+    for brand, report in zip(brands, reports):
+        report.brand_name = brand
+    by_name = {r.brand_name: r for r in reports}
+
+    # 2. Decide the standings
+    matches, wins, rationales = [], dict.fromkeys(brands, 0), {}
+    if mode == "pairwise":
+        pairs = list(itertools.combinations(reports, 2))
+        with ThreadPoolExecutor(max_workers=min(Config.BULK_CONCURRENCY, len(pairs))) as pool:
+            matches = list(pool.map(lambda p: auditor.compare_brands(p[0], p[1], niche), pairs))
+        for match in matches:
+            # Fall back to the visibility score when the model names no winner
+            winner = match.winner or max(match.brand_a, match.brand_b, key=lambda r: r.visibility_score).brand_name
+            wins[winner] += 1
+        order = sorted(brands, key=lambda b: (-wins[b], -by_name[b].visibility_score))
+        leader = order[0]
+        summary = f"{leader} won {wins[leader]} of {len(brands) - 1} head-to-head matches in {niche}."
+    elif mode == "ranking":
+        ranking, summary = auditor.rank_brands(reports, niche)
+        order = [name for name, _ in ranking]
+        rationales = dict(ranking)
+    else:
+        raise ValueError(f"Unknown tournament mode: {mode}")
+
+    tournament = TournamentReport(
+        market_niche=niche,
+        mode=mode,
+        standings=[
+            Standing(rank=i + 1, brand_name=b, visibility_score=by_name[b].visibility_score,
+                     wins=wins[b], rationale=rationales.get(b, ""))
+            for i, b in enumerate(order)
+        ],
+        summary=summary,
+        reports=reports,
+        matches=matches,
     )
 
-    logger.success("🏁 ALL AGENCY TASKS COMPLETED SUCCESSFULLY.")
\ No newline at end of file
+    # 3. One consolidated report for the whole league
+    output_path = Config.REPORTS_DIR / f"League_{niche.replace(' ', '_')}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
+    GEOReporter().generate_tournament_report(tournament.model_dump(), str(output_path))
+
+    logger.success(f"🏟️ League Report Generated: {output_path}")
+    if open_report:
+        webbrowser.open(str(output_path))
+    return tournament
+
+
+def run_competitor_research(client_brand, competitors, niche, mode=None, priority=PRIORITY_INTERACTIVE):
+    """PHASE 3: Live gap analysis of a client against its competitors."""
+    from agents.researcher import CompetitorAgent
+
+    analysis = CompetitorAgent(priority=priority).compare_brands(client_brand, competitors, niche, mode=mode)
+    with VisibilityStore() as history:
+        history.append_competitor_analysis(analysis, niche, client_brand=client_brand)
+    logger.success(f"🛰️ Gap analysis ready for {client_brand}: {len(analysis.citation_gaps)} gaps")
+    return analysis
+
+
+def run_portfolio(fmt="pdf", output=None, niche=None, title=None):
+    """PHASE 3b: One consolidated report across every audited brand, streamed from the audit ledger."""
+    from tools.portfolio import export_portfolio
+
+    Config.initialize_directories()
+    label = niche.replace(' ', '_') if niche else "All"
+    output = output or Config.REPORTS_DIR / f"Portfolio_{label}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{fmt}"
+    title = title or f"{Config.AGENCY_NAME} Portfolio" + (f": {niche}" if niche else "")
+
+    ledger = AuditLedger()
+    try:
+        paths = export_portfolio(ledger.iter_reports(niche), output, fmt, title)
+    finally:
+        ledger.close()
+    return paths
+
+
+# --- Queue workers ---
+def _run_audit_job(job, auditor, history, ledger):
+    """Audits one queued client; a retry reuses work a crashed attempt already recorded."""
+    client = job.payload
+    brand, niche = client['brand_name'], client['niche']
+    key, fingerprint = client_key(client), audit_fingerprint(brand, niche)
+
+    entry = ledger.lookup(key, fingerprint)
+    if entry is not None and (entry["audited_at"] >= job.created_at or client.get("incremental")):
+        if entry["pdf_path"] and Path(entry["pdf_path"]).exists():
+            logger.info(f"♻️ Unchanged: {brand}")
+            return {"brand": brand, "pdf_path": entry["pdf_path"], "reused": True}
+        report_data = entry["report"]
+    else:
+        report = auditor.perform_audit(brand, niche)
+        history.append_audit(report, niche, run_id=client.get("run_id"))
+        report_data = report.model_dump()
+
+    output_path = audit_pdf_path(brand)
+    GEOReporter().generate_report(report_data, str(output_path))
+    ledger.record(key, fingerprint, report_data, str(output_path))
+    return {"brand": brand, "pdf_path": str(output_path), "visibility_score": report_data["visibility_score"]}
+
+
+def _run_job(job, auditor, history, ledger):
+    payload = job.payload
+    # Queued battles and research run at the worker's priority, not as interactive calls
+    priority = auditor.priority
+    if job.kind == "audit":
+        return _run_audit_job(job, auditor, history, ledger)
+    if job.kind == "battle":
+        brands = payload["brands"]
+        if len(brands) == 2 and payload.get("mode") != "pairwise":
+            result = run_competitive_battle(*brands, payload["niche"], open_report=False, priority=priority)
+            return {"winner": result.winner, "summary": result.winner_summary}
+        result = run_tournament(brands, payload["niche"], mode=payload.get("mode", "ranking"), open_report=False,
+                                priority=priority)
+        return {"standings": [s.brand_name for s in result.standings], "summary": result.summary}
+    if job.kind == "compete":
+        result = run_competitor_research(payload["client"], payload["competitors"], payload["niche"],
+                                         mode=payload.get("mode"), priority=priority)
+        return {"gaps": result.citation_gaps}
+    raise ValueError(f"Unknown job kind: {job.kind}")
+
+
+def run_worker(worker_id=None, kinds=None, max_jobs=None, drain=False):
+    """PHASE 4: Pull jobs from the shared queue until stopped.
+
+    Start as many workers as you like, on one host or several sharing
+    Config.QUEUE_PATH. Each job is leased and kept alive by a heartbeat; if
+    the worker dies the lease lapses and another worker picks the job up.
+    drain=True exits once the queue has nothing runnable.
+    """
+    from core.jobs import Heartbeat, JobQueue, default_worker_id
+
+    Config.initialize_directories()
+    worker_id = worker_id or default_worker_id()
+    queue = JobQueue()
+    # Queue work yields to interactive calls sharing the scheduler
+    auditor = GEOAuditor(priority=PRIORITY_BULK)
+    history = VisibilityStore()
+    ledger = AuditLedger()
+    stats = {"done": 0, "retried": 0, "dead": 0}
+    logger.info(f"👷 Worker {worker_id} polling {queue.path.name} for {', '.join(kinds or ['all'])} jobs")
+
+    try:
+        while max_jobs is None or sum(stats.values()) < max_jobs:
+            job = queue.claim(worker_id, kinds)
+            if job is None:
+                history.flush()
+                if drain:
+                    break
+                time.sleep(Config.QUEUE_POLL_SECONDS)
+                continue
+
+            logger.info(f">>> Job {job.id} ({job.kind}, attempt {job.attempts}/{job.max_attempts})")
+            try:
+                with Heartbeat(queue, job, worker_id):
+                    result = _run_job(job, auditor, history, ledger)
+            except KeyboardInterrupt:
+                queue.release(job, worker_id)
+                logger.warning(f"Job {job.id} handed back to the queue")
+                raise
+            except Exception as e:
+                outcome = queue.fail(job, worker_id, f"{type(e).__name__}: {e}")
+                stats["dead" if outcome == "dead" else "retried"] += 1
+                logger.error(f"Job {job.id} failed ({outcome}): {str(e)[:80]}")
+                continue
+            if queue.complete(job, worker_id, result):
+                stats["done"] += 1
+                logger.success(f"Job {job.id} done")
+            else:
+                logger.warning(f"Job {job.id} finished after its lease was taken over")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        try:
+            history.flush()
+        finally:
+            ledger.close()
+            queue.close()
+    logger.info(f"👷 Worker {worker_id} stopped: {stats}")
+    return stats
+
+
+if __name__ == "__main__":
+    # Subcommands (audit, battle, compete, report, portfolio, worker, queue, bench) live in cli.py
+    import cli
+
+    cli.main()
@@ -0,0 +1,133 @@
+import html
+import json
+import itertools
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, List
+from loguru import logger
+from core.config import Config
+from core.telemetry import telemetry
+
+FORMATS = ("pdf", "html", "json")
+
+_HTML_HEAD = """<!DOCTYPE html>
+<html lang="en"><head><meta charset="utf-8"><title>{title}</title>
+<style>
+body {{ font-family: Helvetica, Arial, sans-serif; color: #2c3e50; max-width: 60rem; margin: 2rem auto; }}
+section {{ border-top: 1px solid #ddd; padding: 1rem 0; }}
+.score {{ font-size: 2rem; font-weight: bold; }}
+.good {{ color: #2ecc71; }} .bad {{ color: #e74c3c; }}
+.risk {{ background: #ffebeb; padding: .5rem; margin: .25rem 0; }}
+table {{ border-collapse: collapse; width: 100%; }} td, th {{ border: 1px solid #ccc; padding: .3rem .6rem; }}
+</style></head><body>
+<h1>{title}</h1><p>{agency} | Generated on {date}</p>
+"""
+
+
+def _summary_row(data: dict) -> tuple:
+    return (data['brand_name'], data.get('visibility_score', 0),
+            len(data.get('citations') or []), len(data.get('hallucinations') or []))
+
+
+def _html_section(data: dict) -> str:
+    esc = html.escape
+    score = data.get('visibility_score', 0)
+    parts = [
+        f"<section><h2>Audit: {esc(str(data['brand_name']))}</h2>",
+        f"<p class=\"score {'good' if score > 50 else 'bad'}\">{esc(str(score))}%</p>",
+        "<h3>Strategic Recommendations</h3><ul>",
+        *(f"<li>{esc(str(rec))}</li>" for rec in data.get('recommendations') or []),
+        "</ul>",
+    ]
+    if data.get('citations'):
+        parts.append("<h3>Citations</h3><ul>")
+        parts.extend(
+            f"<li>{esc(str(c.get('source', 'unknown')))} ({esc(str(c.get('sentiment', 'unknown')))}): "
+            f"{esc(str(c.get('context', '')))}</li>"
+            for c in data['citations']
+        )
+        parts.append("</ul>")
+    if data.get('hallucinations'):
+        parts.append("<h3>AI Hallucination &amp; Misinformation Alerts</h3>")
+        parts.extend(
+            f"<div class=\"risk\"><b>Detected Error:</b> {esc(str(h.get('fact', '')))}<br>"
+            f"<i>Correction Needed:</i> {esc(str(h.get('correction', '')))}</div>"
+            for h in data['hallucinations']
+        )
+    parts.append("</section>\n")
+    return "".join(parts)
+
+
+def _write_html(reports: Iterable[dict], path: Path, title: str) -> int:
+    overview = []
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(_HTML_HEAD.format(title=html.escape(title), agency=html.escape(Config.AGENCY_NAME),
+                                  date=datetime.now().strftime('%Y-%m-%d')))
+        for data in reports:
+            f.write(_html_section(data))
+            overview.append(_summary_row(data))
+        f.write(f"<h2>{html.escape(title)}: {len(overview)} brands</h2>\n"
+                "<table><tr><th>Brand Name</th><th>AI Visibility</th><th>Citations</th><th>AI Risks</th></tr>\n")
+        for brand, score, citations, risks in sorted(overview, key=lambda row: -row[1]):
+            f.write(f"<tr><td>{html.escape(str(brand))}</td><td>{score}%</td><td>{citations}</td><td>{risks}</td></tr>\n")
+        f.write("</table></body></html>\n")
+    return len(overview)
+
+
+def _write_json(reports: Iterable[dict], path: Path, title: str) -> int:
+    count = 0
+    with open(path, "w", encoding="utf-8") as f:
+        header = {"title": title, "agency": Config.AGENCY_NAME, "generated_at": datetime.now().isoformat()}
+        # One report at a time, so the whole portfolio is never held in memory
+        f.write(json.dumps(header, ensure_ascii=False)[:-1] + ', "reports": [\n')
+        for data in reports:
+            f.write((",\n" if count else "") + json.dumps(data, ensure_ascii=False, default=str))
+            count += 1
+        f.write(f'\n], "brand_count": {count}}}\n')
+    return count
+
+
+def _write_pdf_volumes(reports: Iterable[dict], path: Path, title: str, volume_size: int) -> List[Path]:
+    """A PDF is only written at the end, so big portfolios are split into volumes to cap memory."""
+    from tools.reporter import GEOReporter
+
+    reports = iter(reports)
+    first = next(reports, None)
+    volumes = []
+    while first is not None:
+        volume = path.with_name(f"{path.stem}_vol{len(volumes) + 1:02d}{path.suffix}")
+        chunk = itertools.chain([first], itertools.islice(reports, volume_size - 1))
+        GEOReporter().generate_portfolio(chunk, str(volume), f"{title} (vol. {len(volumes) + 1})")
+        volumes.append(volume)
+        first = next(reports, None)
+    if len(volumes) == 1:
+        volumes[0] = volumes[0].replace(path)
+    return volumes
+
+
+def export_portfolio(reports: Iterable[dict], output_path, fmt: str = "pdf", title: str = "Client Portfolio",
+                     volume_size: int = None) -> List[str]:
+    """Streams audit dicts into one consolidated report. Returns the files written.
+
+    html and json are written brand by brand in constant memory. pdf holds
+    one volume of Config.PORTFOLIO_VOLUME_BRANDS brands at a time.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown portfolio format: {fmt}")
+    path = Path(output_path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    if fmt == "pdf":
+        paths = [str(p) for p in _write_pdf_volumes(reports, path, title, volume_size or Config.PORTFOLIO_VOLUME_BRANDS)]
+        if not paths:
+            logger.warning("No reports to consolidate; run `cli.py audit` first")
+        elif len(paths) == 1:
+            logger.info(f"📚 Single volume renamed to {path}")
+        return paths
+
+    with telemetry.span("disk_write", "Portfolio"):
+        count = (_write_html if fmt == "html" else _write_json)(reports, path, title)
+    if not count:
+        logger.warning("No reports to consolidate; run `cli.py audit` first")
+    logger.success(f"Portfolio of {count} brands saved as {path}")
+    return [str(path)]
@@ -0,0 +1,119 @@
+import os
+import json
+import queue
+import threading
+from functools import partial
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from loguru import logger
+from core.telemetry import telemetry
+
+_STOP = object()
+
+
+def _init_worker():
+    # A forked child inherits the parent's registry; without this its first
+    # drain would ship the parent's spans and tokens back to be counted twice
+    telemetry.reset()
+
+
+def render_audit_pdf(data: dict, output_path: str) -> dict:
+    """Worker entry point: lays out one audit PDF in a child process.
+
+    Returns the child's drained telemetry so the parent can merge the spans.
+    """
+    from tools.reporter import GEOReporter
+    GEOReporter().generate_report(data, output_path)
+    return telemetry.drain()
+
+
+def render_battle_pdf(brand_a_data: dict, brand_b_data: dict, winner_summary: str, output_path: str) -> dict:
+    """Worker entry point: lays out one battle PDF in a child process."""
+    from tools.reporter import GEOReporter
+    GEOReporter().generate_battle_report(brand_a_data, brand_b_data, winner_summary, output_path)
+    return telemetry.drain()
+
+
+class ReportRenderStage:
+    """CPU-bound PDF rendering decoupled from the network-bound audit loop.
+
+    Producers push validated AuditReport dicts onto a bounded queue; a
+    dispatcher thread hands them to a process pool sized to the machine's
+    cores. A render failure is recorded per brand and the audit itself is
+    written next to the intended PDF as JSON so it is never lost.
+    """
+
+    def __init__(self, workers: int = None, max_pending: int = None):
+        self.workers = workers or os.cpu_count() or 1
+        max_pending = max_pending or self.workers * 4
+
+        self.rendered = []
+        self.failed = []
+
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker)
+        self._dispatcher = threading.Thread(target=self._dispatch, name="render-dispatch", daemon=True)
+        self._dispatcher.start()
+        logger.info(f"🖨️ Render stage started with {self.workers} worker processes")
+
+    def submit(self, brand: str, data: dict, output_path):
+        """Queues an audit PDF. Blocks only when the stage is saturated."""
+        self._queue.put((brand, render_audit_pdf, (data, str(output_path)), data, str(output_path)))
+
+    def submit_battle(self, label: str, brand_a_data: dict, brand_b_data: dict, winner_summary: str, output_path):
+        """Queues a battle PDF."""
+        args = (brand_a_data, brand_b_data, winner_summary, str(output_path))
+        payload = {"brand_a": brand_a_data, "brand_b": brand_b_data, "winner_summary": winner_summary}
+        self._queue.put((label, render_battle_pdf, args, payload, str(output_path)))
+
+    def _dispatch(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            brand, func, args, payload, output_path = item
+            # Bound the work handed to the pool so memory stays flat on huge batches
+            self._slots.acquire()
+            try:
+                future = self._pool.submit(func, *args)
+            except Exception as e:
+                self._slots.release()
+                self._record_failure(brand, payload, output_path, e)
+                continue
+            future.add_done_callback(partial(self._collect, brand, payload, output_path))
+
+    def _collect(self, brand, payload, output_path, future):
+        try:
+            telemetry.merge(future.result())
+            with self._lock:
+                self.rendered.append(brand)
+        except Exception as e:
+            self._record_failure(brand, payload, output_path, e)
+        finally:
+            self._slots.release()
+
+    def _record_failure(self, brand, payload, output_path, error):
+        fallback = Path(output_path).with_suffix(".json")
+        try:
+            fallback.write_text(json.dumps(payload, indent=2, default=str), encoding="utf-8")
+        except OSError as e:
+            logger.error(f"Could not persist audit for {brand}: {e}")
+            fallback = None
+        with self._lock:
+            self.failed.append({"brand": brand, "error": str(error)[:50], "audit_json": str(fallback) if fallback else None})
+        logger.error(f"Render failed: {brand} (audit kept at {fallback})")
+
+    def close(self):
+        """Drains the queue, waits for every render and shuts the pool down."""
+        self._queue.put(_STOP)
+        self._dispatcher.join()
+        self._pool.shutdown(wait=True)
+        return {"rendered": list(self.rendered), "failed": list(self.failed)}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
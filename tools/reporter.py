@@ -1,8 +1,15 @@
+import time
 from fpdf import FPDF
 from datetime import datetime
 from loguru import logger
+from core.telemetry import telemetry
 
 class GEOReporter(FPDF):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Page chrome is the same on every page; build its strings once
+        self._generated_on = datetime.now().strftime('%Y-%m-%d')
+
     def header(self):
         """Professional Header on every page"""
         self.set_font("Helvetica", "B", 10)
@@ -15,12 +22,22 @@ class GEOReporter(FPDF):
         self.set_y(-15)
         self.set_font("Helvetica", "I", 8)
         self.set_text_color(150, 150, 150)
-        self.cell(0, 10, f"Page {self.page_no()} | Generated on {datetime.now().strftime('%Y-%m-%d')}", 0, 0, "C")
+        self.cell(0, 10, f"Page {self.page_no()} | Generated on {self._generated_on}", 0, 0, "C")
 
     def generate_report(self, data, filename):
         """Main method to construct the multi-page report."""
         logger.info(f"Generating PDF report for {data['brand_name']}...")
-        
+        layout_started = time.perf_counter()
+        self.add_audit_section(data)
+        telemetry.observe("pdf_render", "GEOReporter", time.perf_counter() - layout_started)
+
+        # Output the final PDF
+        with telemetry.span("disk_write", "GEOReporter"):
+            self.output(filename)
+        logger.success(f"Report saved as {filename}")
+
+    def add_audit_section(self, data):
+        """Lays out one brand's audit (summary, competitors, hallucinations) on fresh pages."""
         # --- PAGE 1: EXECUTIVE SUMMARY ---
         self.add_page()
         
@@ -59,10 +76,6 @@ class GEOReporter(FPDF):
         # --- PAGE 3: HALLUCINATIONS (IF ANY) ---
         if 'hallucinations' in data and data['hallucinations']:
             self.add_hallucination_page(data['hallucinations'])
-            
-        # Output the final PDF
-        self.output(filename)
-        logger.success(f"Report saved as {filename}")
 
     def add_competitor_page(self, leaderboard_data):
         """Adds a dedicated page comparing the client to competitors."""
@@ -120,6 +133,7 @@ class GEOReporter(FPDF):
             
             #geneerate_battle_report
     def generate_battle_report(self, brand_a_data: dict, brand_b_data: dict, winner_summary: str, output_path: str):
+         layout_started = time.perf_counter()
          self.add_page()
          self.set_font("Helvetica", "B", 22)
     
@@ -161,4 +175,117 @@ class GEOReporter(FPDF):
            row.cell(str(len(brand_a_data.get('hallucinations', []))))
            row.cell(str(len(brand_b_data.get('hallucinations', []))))
 
-         self.output(output_path)
\ No newline at end of file
+         telemetry.observe("pdf_render", "GEOReporter", time.perf_counter() - layout_started)
+         with telemetry.span("disk_write", "GEOReporter"):
+             self.output(output_path)
+
+    def generate_tournament_report(self, tournament: dict, output_path: str):
+        """One consolidated report for an N-brand league: standings, summary, matches."""
+        logger.info(f"Generating tournament report for {len(tournament['standings'])} brands...")
+        layout_started = time.perf_counter()
+        pairwise = tournament.get("mode") == "pairwise"
+
+        # --- PAGE 1: LEAGUE TABLE ---
+        self.add_page()
+        self.set_font("Helvetica", "B", 22)
+        self.set_text_color(44, 62, 80)
+        self.cell(0, 20, f"GEO LEAGUE: {tournament['market_niche']}", 0, 1, "C")
+        self.ln(5)
+
+        self.set_text_color(0, 0, 0)
+        self.set_font("Helvetica", "B", 12)
+        self.set_fill_color(240, 245, 255)
+        self.cell(0, 10, "MARKET AUTHORITY SUMMARY", 1, 1, "L", fill=True)
+        self.set_font("Helvetica", "", 10)
+        self.multi_cell(0, 8, tournament["summary"], 1, "L")
+        self.ln(10)
+
+        reports = {r["brand_name"]: r for r in tournament["reports"]}
+        with self.table(line_height=10, text_align="CENTER", width=190) as table:
+            row = table.row()
+            for title in ("RANK", "BRAND", "AI VISIBILITY", "WINS" if pairwise else "CITATIONS", "AI RISKS"):
+                row.cell(title)
+            for standing in tournament["standings"]:
+                report = reports.get(standing["brand_name"], {})
+                row = table.row()
+                row.cell(str(standing["rank"]))
+                row.cell(standing["brand_name"])
+                row.cell(f"{standing['visibility_score']}%")
+                row.cell(str(standing["wins"]) if pairwise else str(len(report.get("citations") or [])))
+                row.cell(str(len(report.get("hallucinations") or [])))
+
+        # --- PAGE 2: WHY EACH BRAND PLACED WHERE IT DID ---
+        notes = [s for s in tournament["standings"] if s.get("rationale")]
+        if notes:
+            self.add_page()
+            self.set_font("Helvetica", "B", 18)
+            self.cell(0, 15, "Placement Rationale", 0, 1, "L")
+            for standing in notes:
+                self.set_font("Helvetica", "B", 11)
+                self.cell(0, 8, f"#{standing['rank']} {standing['brand_name']}", 0, 1)
+                self.set_font("Helvetica", "", 10)
+                self.multi_cell(0, 7, standing["rationale"], border=0, align="L")
+                self.ln(3)
+
+        # --- PAGE 3+: HEAD-TO-HEAD RESULTS (PAIRWISE ONLY) ---
+        if tournament.get("matches"):
+            self.add_page()
+            self.set_font("Helvetica", "B", 18)
+            self.cell(0, 15, "Head-to-Head Results", 0, 1, "L")
+            for match in tournament["matches"]:
+                a, b = match["brand_a"]["brand_name"], match["brand_b"]["brand_name"]
+                self.set_font("Helvetica", "B", 11)
+                self.cell(0, 8, f"{a} vs {b}  -  winner: {match.get('winner') or 'undecided'}", 0, 1)
+                self.set_font("Helvetica", "", 10)
+                self.multi_cell(0, 7, match["winner_summary"], border=0, align="L")
+                self.ln(3)
+
+        telemetry.observe("pdf_render", "GEOReporter", time.perf_counter() - layout_started)
+        with telemetry.span("disk_write", "GEOReporter"):
+            self.output(output_path)
+        logger.success(f"Tournament report saved as {output_path}")
+
+    def generate_portfolio(self, reports, output_path: str, title: str = "Client Portfolio") -> int:
+        """Many audits in one PDF: a section per brand, then an overview table.
+
+        `reports` can be any iterable (e.g. streamed from the audit ledger);
+        only a one-line summary per brand is kept for the overview.
+        """
+        layout_started = time.perf_counter()
+        overview = []
+        for data in reports:
+            self.add_audit_section(data)
+            overview.append((data['brand_name'], data.get('visibility_score', 0),
+                             len(data.get('citations') or []), len(data.get('hallucinations') or [])))
+        self.add_portfolio_overview(title, overview)
+
+        telemetry.observe("pdf_render", "GEOReporter", time.perf_counter() - layout_started)
+        with telemetry.span("disk_write", "GEOReporter"):
+            self.output(output_path)
+        logger.success(f"Portfolio of {len(overview)} brands saved as {output_path}")
+        return len(overview)
+
+    def add_portfolio_overview(self, title, overview):
+        """Overview table of (brand, score, citations, risks) rows, best score first."""
+        self.add_page()
+        self.set_text_color(44, 62, 80)
+        self.set_font("Helvetica", "B", 18)
+        self.cell(0, 15, f"{title}: {len(overview)} brands", 0, 1, "L")
+        self.ln(5)
+
+        # Plain cells rather than self.table(): it line-breaks every cell, which adds up over hundreds of rows
+        w_brand, w_score, w_cite, w_risk = 85, 35, 35, 35
+        self.set_fill_color(240, 240, 240)
+        self.set_text_color(0, 0, 0)
+        self.set_font("Helvetica", "B", 11)
+        self.cell(w_brand, 12, " Brand Name", 1, 0, "L", fill=True)
+        self.cell(w_score, 12, "AI Visibility", 1, 0, "C", fill=True)
+        self.cell(w_cite, 12, "Citations", 1, 0, "C", fill=True)
+        self.cell(w_risk, 12, "AI Risks", 1, 1, "C", fill=True)
+
+        self.set_font("Helvetica", "", 11)
+        for brand, score, citations, risks in sorted(overview, key=lambda row: -row[1]):
+            self.cell(w_brand, 10, f" {brand}", 1)
+            self.cell(w_score, 10, f"{score}%", 1, 0, "C")
+            self.cell(w_cite, 10, str(citations), 1, 0, "C")
+            self.cell(w_risk, 10, str(risks), 1, 1, "C")
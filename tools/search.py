@@ -1,18 +1,40 @@
 import os
+import time
+import random
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+from typing import List, Optional
 import requests
+from requests.adapters import HTTPAdapter
 from loguru import logger
+from core.config import Config
+from core.scheduler import PRIORITY_BULK, get_scheduler, estimate_tokens
+from core.telemetry import telemetry
+from core import singleflight
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class SearchError(Exception):
+    """A query that produced no research: no API key, a non-retryable error, or retries exhausted."""
+
 
 class PerplexitySearch:
-    def __init__(self):
+    def __init__(self, max_workers: int = None, priority: int = PRIORITY_BULK):
+        self.priority = priority
         self.api_key = os.getenv("PERPLEXITY_API_KEY")
-        self.base_url = "https://api.perplexity.ai/chat/completions"
+        self.base_url = os.getenv("PERPLEXITY_BASE_URL", "https://api.perplexity.ai/chat/completions")
+        self.max_workers = max_workers or Config.SEARCH_MAX_WORKERS
+        self.timeout = (Config.SEARCH_CONNECT_TIMEOUT, Config.SEARCH_READ_TIMEOUT)
 
-    def search(self, query: str):
-        if not self.api_key:
-            logger.error("Perplexity API Key missing!")
-            return None
+        # One keep-alive session so queries reuse the TLS connection
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_workers)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
 
-        payload = {
+    def _build_payload(self, query: str) -> dict:
+        return {
             "model": "sonar-pro", # Latest 2026 high-performance model
             "messages": [
                 {"role": "system", "content": "You are a GEO Researcher. Provide raw, cited search data."},
@@ -20,16 +42,92 @@ class PerplexitySearch:
             ],
             "temperature": 0.2
         }
-        
+
+    @staticmethod
+    def _retry_after(response, attempt: int) -> float:
+        """Seconds to wait before the next attempt, honoring Retry-After when sent."""
+        header = response.headers.get("Retry-After") if response is not None else None
+        if header:
+            try:
+                return max(0.0, float(header))
+            except ValueError:
+                try:
+                    return max(0.0, parsedate_to_datetime(header).timestamp() - time.time())
+                except (TypeError, ValueError):
+                    pass
+        # Exponential backoff with jitter: 1s, 2s, 4s ... capped
+        delay = min(Config.SEARCH_BACKOFF_CAP, Config.SEARCH_BACKOFF_BASE * (2 ** attempt))
+        return delay * (0.5 + random.random() / 2)
+
+    def search(self, query: str) -> str:
+        """Runs one query; identical queries already in flight share its answer.
+
+        Raises SearchError instead of returning nothing, so callers never
+        prompt a model with an empty research payload.
+        """
+        if not Config.SINGLE_FLIGHT:
+            return self._search(query)
+        return singleflight.do("search", f"{self.base_url}\n{query}", self._search, query)
+
+    def _search(self, query: str) -> str:
+        if not self.api_key:
+            raise SearchError("Perplexity API Key missing!")
+
         headers = {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json"
-    }
+        }
+        payload = self._build_payload(query)
+        scheduler = get_scheduler()
+        estimate = estimate_tokens(payload["messages"])
+
+        for attempt in range(Config.SEARCH_MAX_RETRIES + 1):
+            response = None
+            try:
+                with scheduler.slot("perplexity", self.priority, estimate) as ticket:
+                    with telemetry.span("search", "PerplexitySearch"):
+                        response = self.session.post(self.base_url, json=payload, headers=headers, timeout=self.timeout)
+                    ticket.throttled = response.status_code == 429
+                    ticket.congested = response.status_code >= 500
+                    if response.status_code not in RETRYABLE_STATUS:
+                        response.raise_for_status()
+                        body = response.json()
+                        ticket.tokens_used = body.get("usage", {}).get("total_tokens")
+                        telemetry.record_usage("PerplexitySearch", payload["model"], body.get("usage"))
+                        return body['choices'][0]['message']['content']
+                error = f"HTTP {response.status_code}"
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = f"{type(e).__name__}: {e}"
+            except Exception as e:
+                # 4xx (other than 429) and malformed bodies will not improve on retry
+                raise SearchError(f"Search failed: {e}") from e
+
+            if attempt == Config.SEARCH_MAX_RETRIES:
+                break
+            delay = self._retry_after(response, attempt)
+            logger.warning(f"Search retry {attempt + 1}/{Config.SEARCH_MAX_RETRIES} in {delay:.1f}s ({error})")
+            time.sleep(delay)
 
+        raise SearchError(f"Search failed after {Config.SEARCH_MAX_RETRIES + 1} attempts: {error}")
+
+    def _search_or_none(self, query: str) -> Optional[str]:
         try:
-            response = requests.post(self.base_url, json=payload, headers=headers)
-            response.raise_for_status()
-            return response.json()['choices'][0]['message']['content']
-        except Exception as e:
-            logger.error(f"Search failed: {e}")
-            return None
\ No newline at end of file
+            return self.search(query)
+        except SearchError as e:
+            logger.error(str(e))
+            return None
+
+    def search_many(self, queries: List[str]) -> List[Optional[str]]:
+        """Runs queries concurrently over the pooled session; results keep input order.
+
+        A query that failed is None in the result (and logged), so one bad
+        query doesn't discard the rest of the batch.
+        """
+        if not queries:
+            return []
+        workers = min(self.max_workers, len(queries))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="perplexity") as pool:
+            return list(pool.map(self._search_or_none, queries))
+
+    def close(self):
+        self.session.close()